@@ -13,12 +13,35 @@ Supported Conditions:
 - Pulmonary embolism ECG signs
 """
 
+import asyncio
 import json
 import re
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+import threading
+from functools import lru_cache
+from heapq import nlargest
+from operator import attrgetter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, FrozenSet, Set, Tuple
+from openai import OpenAI, AsyncOpenAI
+import httpx
 import os
 
+try:
+    import hyperscan  # Optional: multi-pattern DFA scanner
+except ImportError:
+    hyperscan = None
+
+try:
+    import ahocorasick  # Optional: literal-anchor prefilter
+except ImportError:
+    ahocorasick = None
+
+try:
+    import numpy as np
+    from numba import njit  # Optional: JIT anchor prefilter
+except ImportError:
+    njit = None
+
 from app.core.evidence_layer import (
     Evidence, Finding, DiagnosticHypothesis, AgentReport,
     EvidenceType, EvidenceStrength, Severity, calculate_confidence
@@ -26,8 +49,25 @@ from app.core.evidence_layer import (
 from app.core.disease_modules import (
     STEMI, NSTEMI, ATRIAL_FIBRILLATION, PERICARDITIS, PULMONARY_EMBOLISM, HEART_FAILURE
 )
+from app.core.utils import hyperscan_compatible
+from app.core.gpt_cache import GPTResponseCache, prompt_key
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Shared pooled HTTP clients keep TCP/TLS connections alive across requests
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+_HTTP_TIMEOUT = httpx.Timeout(15.0, connect=2.0)
+client = OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    http_client=httpx.Client(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+)
+aclient = AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    http_client=httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=_HTTP_TIMEOUT)
+)
+
+# Parsed GPT replies; only successful parses are stored, so a failed call is retried next time
+_gpt_cache = GPTResponseCache(maxsize=1024, path=os.environ.get("GPT_CACHE_PATH"))
 
 # ============================================================================
 # DEFINITIVE CARDIAC FINDINGS - Gold standard evidence that confirms diagnosis
@@ -60,23 +100,35 @@ DEFINITIVE_CARDIAC_FINDINGS = {
     }
 }
 
+# One alternation per condition, compiled once, so each condition is a single search
+_COMPILED_DEFINITIVE = {
+    condition: re.compile("|".join(f"(?:{p})" for p in config["patterns"]))
+    for condition, config in DEFINITIVE_CARDIAC_FINDINGS.items()
+}
+
+
+@lru_cache(maxsize=1024)
+def _find_definitive_condition(text_lower: str) -> Optional[str]:
+    for condition, regex in _COMPILED_DEFINITIVE.items():
+        if regex.search(text_lower):
+            return condition
+    return None
+
 
 def check_definitive_cardiac_findings(text: str) -> Optional[Dict[str, Any]]:
     """Check for definitive cardiac diagnostic findings."""
-    text_lower = text.lower()
-    
-    for condition, config in DEFINITIVE_CARDIAC_FINDINGS.items():
-        for pattern in config["patterns"]:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return {
-                    "condition": condition,
-                    "diagnosis": config["diagnosis"],
-                    "confidence": config["confidence"],
-                    "explanation": config["explanation"],
-                    "icd10": config["icd10"],
-                    "is_definitive": True
-                }
-    return None
+    condition = _find_definitive_condition(text.lower())
+    if condition is None:
+        return None
+    config = DEFINITIVE_CARDIAC_FINDINGS[condition]
+    return {
+        "condition": condition,
+        "diagnosis": config["diagnosis"],
+        "confidence": config["confidence"],
+        "explanation": config["explanation"],
+        "icd10": config["icd10"],
+        "is_definitive": True
+    }
 
 
 # ============================================================================
@@ -93,6 +145,7 @@ ECG_PATTERNS = {
             r"acute\s*mi",
             r"transmural\s*(infarct|ischemia)"
         ],
+        "anchors": ["elevation", "stemi", "elevat", "acute", "transmural"],  # Literal each pattern requires
         "finding": "ST Elevation",
         "significance": "Acute transmural ischemia - STEMI until proven otherwise",
         "severity": Severity.CRITICAL,
@@ -101,6 +154,7 @@ ECG_PATTERNS = {
     },
     "reciprocal_depression": {
         "patterns": [r"reciprocal\s*(st)?\s*depression", r"mirror\s*image\s*change"],
+        "anchors": ["reciprocal", "mirror"],
         "finding": "Reciprocal ST Depression",
         "significance": "Supports diagnosis of acute STEMI",
         "severity": Severity.HIGH,
@@ -108,6 +162,7 @@ ECG_PATTERNS = {
     },
     "hyperacute_t": {
         "patterns": [r"hyperacute\s*t\s*wave", r"tall\s*peaked\s*t\s*wave"],
+        "anchors": ["hyperacute", "peaked"],
         "finding": "Hyperacute T Waves",
         "significance": "Very early sign of acute MI",
         "severity": Severity.CRITICAL,
@@ -122,6 +177,7 @@ ECG_PATTERNS = {
             r"horizontal\s*st\s*depression",
             r"downsloping\s*st"
         ],
+        "anchors": ["depression", "depress", "horizontal", "downsloping"],
         "finding": "ST Depression",
         "significance": "Suggests subendocardial ischemia or NSTEMI",
         "severity": Severity.HIGH,
@@ -134,6 +190,7 @@ ECG_PATTERNS = {
             r"deep\s*t\s*wave\s*inversion",
             r"wellens"  # Wellens syndrome
         ],
+        "anchors": ["inversion", "inverted", "inversion", "wellens"],
         "finding": "T Wave Inversion",
         "significance": "May indicate ischemia, prior infarct, or other pathology",
         "severity": Severity.MODERATE,
@@ -150,6 +207,7 @@ ECG_PATTERNS = {
             r"no\s*p\s*waves?\s*(with|and)\s*irregular",
             r"fibrillatory\s*waves?"
         ],
+        "anchors": ["fibrillation", "fib", "afib", "irregularly", "irregular", "fibrillatory"],
         "finding": "Atrial Fibrillation",
         "significance": "Irregular rhythm with stroke risk - needs rate/rhythm control and anticoagulation assessment",
         "severity": Severity.MODERATE,
@@ -157,6 +215,7 @@ ECG_PATTERNS = {
     },
     "atrial_flutter": {
         "patterns": [r"atrial\s*flutter", r"sawtooth\s*(pattern|waves?)", r"flutter\s*waves?"],
+        "anchors": ["flutter", "sawtooth", "flutter"],
         "finding": "Atrial Flutter",
         "significance": "Regular atrial tachyarrhythmia, often 2:1 or 4:1 block",
         "severity": Severity.MODERATE,
@@ -170,6 +229,7 @@ ECG_PATTERNS = {
             r"monomorphic\s*vt",
             r"polymorphic\s*vt"
         ],
+        "anchors": ["ventricular", "vt", "complex", "monomorphic", "polymorphic"],
         "finding": "Ventricular Tachycardia",
         "significance": "Life-threatening arrhythmia - immediate intervention may be needed",
         "severity": Severity.CRITICAL,
@@ -182,6 +242,7 @@ ECG_PATTERNS = {
             r"(rate|hr)\s*(of\s*)?15\d\s*bpm",
             r"tachycardia\s*\d{3}"
         ],
+        "anchors": ["tachycardia", "bpm", "bpm", "tachycardia"],
         "finding": "Sinus Tachycardia",
         "significance": "May be physiologic or indicate underlying condition (infection, PE, pain, anxiety)",
         "severity": Severity.LOW,
@@ -189,6 +250,7 @@ ECG_PATTERNS = {
     },
     "bradycardia": {
         "patterns": [r"bradycardia", r"(rate|hr)\s*(of\s*)?[3-5]\d\s*bpm", r"slow\s*(rate|rhythm)"],
+        "anchors": ["bradycardia", "bpm", "slow"],
         "finding": "Bradycardia",
         "significance": "May be physiologic or pathologic (heart block, medication, hypothyroidism)",
         "severity": Severity.MODERATE,
@@ -198,6 +260,7 @@ ECG_PATTERNS = {
     # Conduction abnormalities
     "lbbb": {
         "patterns": [r"left\s*bundle\s*branch\s*block", r"\blbbb\b", r"new\s*lbbb"],
+        "anchors": ["bundle", "lbbb", "lbbb"],
         "finding": "Left Bundle Branch Block",
         "significance": "New LBBB with symptoms is STEMI equivalent",
         "severity": Severity.HIGH,
@@ -205,6 +268,7 @@ ECG_PATTERNS = {
     },
     "rbbb": {
         "patterns": [r"right\s*bundle\s*branch\s*block", r"\brbbb\b"],
+        "anchors": ["bundle", "rbbb"],
         "finding": "Right Bundle Branch Block",
         "significance": "May be normal variant or indicate RV strain (PE, pulmonary HTN)",
         "severity": Severity.LOW,
@@ -217,6 +281,7 @@ ECG_PATTERNS = {
             r"mobitz\s*(type)?\s*(i|ii|1|2)",
             r"wenckebach"
         ],
+        "anchors": ["block", "block", "mobitz", "wenckebach"],
         "finding": "AV Block",
         "significance": "Conduction system disease - may need pacing",
         "severity": Severity.HIGH,
@@ -227,6 +292,7 @@ ECG_PATTERNS = {
     # CTPA is the gold standard. ECG signs suggest PE but don't confirm it.
     "s1q3t3": {
         "patterns": [r"s1q3t3", r"s1\s*q3\s*t3", r"s1\s*,?\s*q3\s*,?\s*t3"],
+        "anchors": ["s1q3t3", "s1", "s1"],
         "finding": "S1Q3T3 Pattern",
         "significance": "Classic sign suggesting PE, but low sensitivity (~20%). Supportive, not diagnostic.",
         "severity": Severity.HIGH,
@@ -235,6 +301,7 @@ ECG_PATTERNS = {
     },
     "right_axis_deviation": {
         "patterns": [r"right\s*axis\s*deviation", r"rad\b"],
+        "anchors": ["deviation", "rad"],
         "finding": "Right Axis Deviation",
         "significance": "May indicate RV strain from PE. Supportive evidence only.",
         "severity": Severity.LOW,
@@ -249,6 +316,7 @@ ECG_PATTERNS = {
             r"widespread\s*st\s*elevation",
             r"st\s*elevation\s*(in\s*)?(multiple|all|many)\s*leads"
         ],
+        "anchors": ["diffuse", "widespread", "elevation"],
         "finding": "Diffuse ST Elevation",
         "significance": "Suggests pericarditis rather than focal ischemia",
         "severity": Severity.MODERATE,
@@ -256,6 +324,7 @@ ECG_PATTERNS = {
     },
     "pr_depression": {
         "patterns": [r"pr\s*(segment)?\s*depression", r"depressed\s*pr"],
+        "anchors": ["depression", "depressed"],
         "finding": "PR Depression",
         "significance": "Highly specific for acute pericarditis",
         "severity": Severity.MODERATE,
@@ -269,6 +338,7 @@ ECG_PATTERNS = {
             r"\blvh\b",
             r"voltage\s*criteria\s*(for|of)\s*lvh"
         ],
+        "anchors": ["hypertrophy", "lvh", "voltage"],
         "finding": "Left Ventricular Hypertrophy",
         "significance": "Suggests chronic hypertension or cardiomyopathy",
         "severity": Severity.LOW,
@@ -278,6 +348,7 @@ ECG_PATTERNS = {
     # PVCs
     "pvcs": {
         "patterns": [r"premature\s*ventricular\s*contraction", r"\bpvc\b", r"ventricular\s*ectop\w*"],
+        "anchors": ["premature", "pvc", "ectop"],
         "finding": "Premature Ventricular Contractions",
         "significance": "Usually benign, but frequent PVCs may indicate underlying disease",
         "severity": Severity.LOW,
@@ -292,6 +363,7 @@ ECG_PATTERNS = {
             r"sinus\s*rhythm\s*(at\s*)?\d{2}\s*bpm",
             r"regular\s*rhythm"
         ],
+        "anchors": ["sinus", "nsr", "sinus", "regular"],
         "finding": "Normal Sinus Rhythm",
         "significance": "Normal cardiac rhythm",
         "severity": Severity.NORMAL,
@@ -299,89 +371,282 @@ ECG_PATTERNS = {
     }
 }
 
+# Patterns run case-sensitively against lowered text, so they must be lowercase
+assert all(
+    p == p.lower()
+    for table in (ECG_PATTERNS, DEFINITIVE_CARDIAC_FINDINGS)
+    for config in table.values()
+    for p in config["patterns"]
+)
 
-def _is_negated_ecg(text: str, match_start: int) -> bool:
-    """Check if an ECG finding is negated (e.g., 'no ST elevation')."""
-    prefix = text[max(0, match_start - 30):match_start].lower()
-    negation_patterns = [
-        r"\bno\b", r"\bnot\b", r"\bwithout\b", r"\babsent\b", r"\bnegative\b",
-        r"\brules?\s*out\b", r"\bno\s*evidence\b"
+_COMPILED_ECG = {
+    key: [re.compile(p) for p in config["patterns"]]
+    for key, config in ECG_PATTERNS.items()
+}
+
+
+def _build_ecg_scanner():
+    """
+    Fuse every ECG pattern into one alternation so the report is scanned once.
+    The alternation sits inside a lookahead so overlapping findings (e.g. "ST
+    elevation in all leads" is both ST elevation and diffuse ST elevation) are
+    not swallowed by finditer consuming the text.
+    """
+    alternatives = [
+        f"(?:{pattern})" for config in ECG_PATTERNS.values() for pattern in config["patterns"]
     ]
-    for neg in negation_patterns:
-        if re.search(neg, prefix):
-            return True
-    return False
+    return re.compile("(?=" + "|".join(alternatives) + ")")
+
+
+_ECG_SCANNER = _build_ecg_scanner()
+
+
+def _build_ecg_hyperscan_db():
+    """Compile every ECG pattern into one Hyperscan database, if available."""
+    if hyperscan is None:
+        return None, ()
+    keys = []
+    expressions = []
+    for key, config in ECG_PATTERNS.items():
+        for pattern in config["patterns"]:
+            keys.append(key)
+            expressions.append(pattern.encode())
+    db = hyperscan.Database()
+    try:
+        db.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=hyperscan.HS_FLAG_SOM_LEFTMOST
+        )
+    except hyperscan.error:
+        return None, ()
+    return db, tuple(keys)
+
+
+_ECG_HS_DB, _ECG_HS_KEYS = _build_ecg_hyperscan_db()
+_hs_local = threading.local()  # Hyperscan scratch space is not thread-safe
+
+
+def _index_patterns_by_anchor() -> Dict[str, List]:
+    """
+    Index every pattern under the literal it cannot match without, so a report
+    only runs the regexes whose anchor actually occurs in it.
+    """
+    patterns_by_anchor = {}
+    for key, config in ECG_PATTERNS.items():
+        # strict: a pattern added without its anchor would otherwise never run
+        for anchor, pat in zip(config["anchors"], _COMPILED_ECG[key], strict=True):
+            patterns_by_anchor.setdefault(anchor, []).append((key, pat))
+    return patterns_by_anchor
+
+
+_ECG_PATTERNS_BY_ANCHOR = _index_patterns_by_anchor()
+_ECG_ANCHORS = tuple(_ECG_PATTERNS_BY_ANCHOR)
+
+
+def _build_ecg_anchor_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for anchor in _ECG_ANCHORS:
+        automaton.add_word(anchor, anchor)
+    automaton.make_automaton()
+    return automaton
+
+
+_ECG_AUTOMATON = _build_ecg_anchor_automaton()
+
+# The Numba scan reports anchors in one uint64 mask; past 64 anchors it is skipped
+if njit is not None and len(_ECG_ANCHORS) <= 64:
+    _ANCHOR_BYTES = np.frombuffer("".join(_ECG_ANCHORS).encode(), dtype=np.uint8)
+    _ANCHOR_OFFSETS = np.cumsum([0] + [len(a) for a in _ECG_ANCHORS]).astype(np.int64)
+    
+    @njit(cache=True)
+    def _scan_anchor_mask(text, anchor_bytes, anchor_offsets):
+        """Bitmask of the anchors occurring in the lowered UTF-8 text."""
+        mask = np.uint64(0)
+        n = text.shape[0]
+        for a in range(anchor_offsets.shape[0] - 1):
+            lo = anchor_offsets[a]
+            length = anchor_offsets[a + 1] - lo
+            for i in range(n - length + 1):
+                j = 0
+                while j < length and text[i + j] == anchor_bytes[lo + j]:
+                    j += 1
+                if j == length:
+                    mask |= np.uint64(1) << np.uint64(a)
+                    break
+        return mask
+else:
+    _scan_anchor_mask = None
+
+
+def _present_anchors(text_lower: str) -> Optional[Set[str]]:
+    """Anchors occurring in the text, or None when no prefilter is available."""
+    if _ECG_AUTOMATON is not None:
+        return {anchor for _, anchor in _ECG_AUTOMATON.iter(text_lower)}
+    if _scan_anchor_mask is not None:
+        # ASCII anchors occur in the UTF-8 bytes exactly when they occur in the str
+        text_bytes = np.frombuffer(text_lower.encode(), dtype=np.uint8)
+        mask = int(_scan_anchor_mask(text_bytes, _ANCHOR_BYTES, _ANCHOR_OFFSETS))
+        return {anchor for i, anchor in enumerate(_ECG_ANCHORS) if mask >> i & 1}
+    return None
+
+
+def _on_hyperscan_match(pattern_id: int, start: int, end: int, flags: int, hits: List) -> None:
+    hits.append((pattern_id, start))
+
+
+@lru_cache(maxsize=1024)
+def _match_ecg_keys(text_lower: str) -> FrozenSet[str]:
+    """
+    Return the ECG_PATTERNS keys with a pattern whose first match is not
+    negated. Later occurrences do not count: "no atrial fibrillation on prior;
+    now atrial fibrillation" stays unmatched, as with a plain re.search.
+    """
+    matched_keys = set()
+    
+    # Hyperscan reports byte offsets and has narrower \s/\w classes than re
+    if _ECG_HS_DB is not None and hyperscan_compatible(text_lower):
+        scratch = getattr(_hs_local, "scratch", None)
+        if scratch is None:
+            scratch = _hs_local.scratch = hyperscan.Scratch(_ECG_HS_DB)
+        hits = []
+        _ECG_HS_DB.scan(text_lower.encode(), match_event_handler=_on_hyperscan_match, context=hits, scratch=scratch)
+        # Leftmost start per pattern is where re.search would match
+        first_starts = {}
+        for pattern_id, start in hits:
+            if start < first_starts.get(pattern_id, start + 1):
+                first_starts[pattern_id] = start
+        for pattern_id, start in first_starts.items():
+            if not _is_negated_ecg(text_lower, start):
+                matched_keys.add(_ECG_HS_KEYS[pattern_id])
+        return frozenset(matched_keys)
+    
+    anchors = _present_anchors(text_lower)
+    if anchors is not None:
+        for anchor in anchors:
+            for key, pat in _ECG_PATTERNS_BY_ANCHOR[anchor]:
+                if key in matched_keys:
+                    continue
+                match = pat.search(text_lower)
+                if match and not _is_negated_ecg(text_lower, match.start()):
+                    matched_keys.add(key)
+        return frozenset(matched_keys)
+    
+    # Positions come in order, so the first position a pattern matches at is
+    # its first match. The alternation only reports one pattern per position,
+    # so the patterns not yet seen are tried here too.
+    seen = set()
+    for match in _ECG_SCANNER.finditer(text_lower):
+        start = match.start()
+        negated = _is_negated_ecg(text_lower, start)
+        for key, patterns in _COMPILED_ECG.items():
+            for i, pat in enumerate(patterns):
+                if (key, i) in seen or not pat.match(text_lower, start):
+                    continue
+                seen.add((key, i))
+                if not negated:
+                    matched_keys.add(key)
+    return frozenset(matched_keys)
+
+
+_NEG_RE = re.compile(r"\b(?:no|not|without|absent|negative|rules?\s*out|no\s*evidence)\b")
+
+
+def _is_negated_ecg(text_lower: str, match_start: int) -> bool:
+    """Check if an ECG finding is negated (e.g., 'no ST elevation')."""
+    return _NEG_RE.search(text_lower[max(0, match_start - 30):match_start]) is not None
+
+
+# (key, finding, significance, severity, evidence) in ECG_PATTERNS order. Evidence
+# is frozen, so each pattern's template instance is shared by every finding.
+_ECG_ITEMS = tuple(
+    (
+        key,
+        config["finding"],
+        config["significance"],
+        config["severity"],
+        Evidence(
+            type=EvidenceType.ECG,
+            description=f"ECG pattern: {config['finding']}",
+            value=config["finding"],
+            is_abnormal=config["severity"] != Severity.NORMAL,
+            strength=EvidenceStrength.STRONG if config["severity"] in [Severity.HIGH, Severity.CRITICAL] else EvidenceStrength.MODERATE,
+            source="ecg_interpretation"
+        )
+    )
+    for key, config in ECG_PATTERNS.items()
+)
 
 
 def extract_ecg_findings(text: str) -> List[Finding]:
     """Extract ECG findings using clinical pattern matching with negation detection."""
     findings = []
-    text_lower = text.lower()
-    matched_keys = set()
+    matched_keys = _match_ecg_keys(text.lower())
     
-    for key, config in ECG_PATTERNS.items():
-        if key in matched_keys:
+    for key, name, significance, severity, evidence in _ECG_ITEMS:
+        if key not in matched_keys:
             continue
-        for pattern in config["patterns"]:
-            match = re.search(pattern, text_lower, re.IGNORECASE)
-            if match:
-                # Check for negation
-                if _is_negated_ecg(text_lower, match.start()):
-                    continue
-                    
-                evidence = Evidence(
-                    type=EvidenceType.ECG,
-                    description=f"ECG pattern: {config['finding']}",
-                    value=config["finding"],
-                    is_abnormal=config["severity"] != Severity.NORMAL,
-                    strength=EvidenceStrength.STRONG if config["severity"] in [Severity.HIGH, Severity.CRITICAL] else EvidenceStrength.MODERATE,
-                    source="ecg_interpretation"
-                )
-                finding = Finding(
-                    name=config["finding"],
-                    present=True,
-                    evidence=[evidence],
-                    clinical_significance=config["significance"],
-                    severity=config["severity"]
-                )
-                findings.append(finding)
-                matched_keys.add(key)
-                break
+        finding = Finding(
+            name=name,
+            present=True,
+            evidence=[evidence],
+            clinical_significance=significance,
+            severity=severity
+        )
+        findings.append(finding)
     
     return findings
 
 
+# Finding name -> disease keys it supports (finding names are unique per entry)
+FINDING_TO_DISEASES: Dict[str, List[str]] = {
+    config["finding"]: config["diseases"] for config in ECG_PATTERNS.values()
+}
+
+_DISEASE_MAP = {
+    "stemi": STEMI,
+    "nstemi": NSTEMI,
+    "atrial_fibrillation": ATRIAL_FIBRILLATION,
+    "pericarditis": PERICARDITIS,
+    "pulmonary_embolism": PULMONARY_EMBOLISM,
+    "heart_failure": HEART_FAILURE
+}
+
+# (criterion, lowered criterion) pairs so matching never re-lowers the criteria
+_DISEASE_LOWER_CRITERIA = {
+    key: tuple((c, c.lower()) for c in disease.ecg_findings)
+    for key, disease in _DISEASE_MAP.items()
+}
+
+_MAX_CARDIAC_HYPOTHESES = 8  # Above len(_DISEASE_MAP), so nothing is dropped today
+_MI_WORKUP = ("Troponin", "Clinical correlation", "Serial ECGs")
+_GENERIC_WORKUP = ("Clinical correlation",)
+
+
 def build_cardiac_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothesis]:
     """Build cardiac diagnostic hypotheses based on ECG findings."""
     disease_scores: Dict[str, Dict] = {}
     
     for finding in findings:
-        for key, config in ECG_PATTERNS.items():
-            if finding.name == config["finding"]:
-                for disease_key in config["diseases"]:
-                    if disease_key not in disease_scores:
-                        disease_scores[disease_key] = {"findings": [], "critical": False, "evidence": []}
-                    disease_scores[disease_key]["findings"].append(finding.name)
-                    disease_scores[disease_key]["evidence"].extend(finding.evidence)
-                    if finding.severity == Severity.CRITICAL:
-                        disease_scores[disease_key]["critical"] = True
-    
-    disease_map = {
-        "stemi": STEMI,
-        "nstemi": NSTEMI,
-        "atrial_fibrillation": ATRIAL_FIBRILLATION,
-        "pericarditis": PERICARDITIS,
-        "pulmonary_embolism": PULMONARY_EMBOLISM,
-        "heart_failure": HEART_FAILURE
-    }
+        for disease_key in FINDING_TO_DISEASES.get(finding.name, ()):
+            if disease_key not in disease_scores:
+                disease_scores[disease_key] = {"findings": [], "critical": False, "evidence": []}
+            disease_scores[disease_key]["findings"].append(finding.name)
+            disease_scores[disease_key]["evidence"].extend(finding.evidence)
+            if finding.severity == Severity.CRITICAL:
+                disease_scores[disease_key]["critical"] = True
     
     hypotheses = []
     for disease_key, score_data in disease_scores.items():
-        if disease_key not in disease_map:
+        if disease_key not in _DISEASE_MAP:
             continue
-        disease = disease_map[disease_key]
+        disease = _DISEASE_MAP[disease_key]
         
-        criteria_met = [c for c in disease.ecg_findings if any(c.lower() in f.lower() for f in score_data["findings"])]
+        found_lower = [f.lower() for f in score_data["findings"]]
+        criteria_met = [c for c, c_lower in _DISEASE_LOWER_CRITERIA[disease_key] if any(c_lower in f for f in found_lower)]
         match_ratio = len(criteria_met) / max(len(disease.ecg_findings), 1)
         
         # ECG alone typically provides moderate probability - needs clinical correlation
@@ -400,55 +665,180 @@ def build_cardiac_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothes
                 required_for_diagnosis=disease.major_criteria[:3],
                 criteria_met=criteria_met,
                 differential_diagnoses=disease.differential_diagnoses[:3],
-                recommended_workup=["Troponin", "Clinical correlation", "Serial ECGs"] if "mi" in disease_key.lower() or disease_key == "stemi" or disease_key == "nstemi" else ["Clinical correlation"],
+                recommended_workup=list(_MI_WORKUP if "mi" in disease_key.lower() or disease_key == "stemi" or disease_key == "nstemi" else _GENERIC_WORKUP),
                 urgency=Severity.CRITICAL if score_data["critical"] else Severity(disease.default_urgency)
             ))
     
-    hypotheses.sort(key=lambda h: h.probability, reverse=True)
-    return hypotheses
-
-
-def get_gpt_ecg_interpretation(text: str, findings: List[Finding]) -> Dict[str, Any]:
-    """Get GPT interpretation for ECG analysis."""
-    findings_summary = "\n".join([f"- {f.name}: {f.clinical_significance}" for f in findings])
-    
-    prompt = f"""You are a cardiologist interpreting an ECG.
-
-ECG Description: "{text}"
+    # Equivalent to a stable descending sort truncated to the top few
+    return nlargest(_MAX_CARDIAC_HYPOTHESES, hypotheses, key=attrgetter("probability"))
 
-Identified findings:
-{findings_summary if findings else "No specific abnormalities identified"}
 
-Provide interpretation in JSON format:
-{{
+# Fixed prompt pieces, hoisted so only the per-ECG parts are formatted per call
+_ECG_RESPONSE_SCHEMA = """{
     "interpretation": "Brief ECG interpretation",
     "rhythm": "Identified rhythm",
     "rate_assessment": "Normal/Tachycardia/Bradycardia",
     "concerning_features": ["List any concerning features"],
     "confidence": 0.0-1.0,
     "urgent_action_needed": true/false
-}}
+}"""
+_ECG_PROMPT_INTRO = 'You are a cardiologist interpreting an ECG.\n\nECG Description: "'
+_ECG_PROMPT_FINDINGS = '"\n\nIdentified findings:\n'
+_ECG_PROMPT_OUTRO = "\n\nProvide interpretation in JSON format:\n" + _ECG_RESPONSE_SCHEMA + "\n\nReturn ONLY valid JSON."
+
+
+def _summarize_ecg_findings(findings: List[Finding]) -> str:
+    if not findings:
+        return "No specific abnormalities identified"
+    return "\n".join(f"- {f.name}: {f.clinical_significance}" for f in findings)
+
+
+def _build_ecg_prompt(text: str, findings: List[Finding]) -> str:
+    return "".join([_ECG_PROMPT_INTRO, text, _ECG_PROMPT_FINDINGS, _summarize_ecg_findings(findings), _ECG_PROMPT_OUTRO])
 
-Return ONLY valid JSON."""
 
+def _ecg_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": "You are a cardiologist. Reply as JSON."},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _fallback_ecg_interpretation() -> Dict[str, Any]:
+    return {"interpretation": "Unable to generate interpretation", "rhythm": "Unknown", "confidence": 0.3}
+
+
+def get_gpt_ecg_interpretation(text: str, findings: List[Finding]) -> Dict[str, Any]:
+    """Get GPT interpretation for ECG analysis."""
+    prompt = _build_ecg_prompt(text, findings)
+    key = prompt_key(prompt)
+    cached = _gpt_cache.get(key)
+    if cached is not None:
+        return cached
     try:
         response = client.chat.completions.create(
             model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
+            messages=_ecg_messages(prompt),
+            response_format={"type": "json_object"},  # JSON mode: body is always parseable
             timeout=15
         )
-        raw = response.choices[0].message.content
-        start, end = raw.find("{"), raw.rfind("}") + 1
-        if start != -1 and end > start:
-            return json.loads(raw[start:end])
+        parsed = json.loads(response.choices[0].message.content)
+        _gpt_cache.put(key, parsed)
+        return parsed
     except:
         pass
     
-    return {"interpretation": "Unable to generate interpretation", "rhythm": "Unknown", "confidence": 0.3}
+    return _fallback_ecg_interpretation()
+
+
+async def get_gpt_ecg_interpretation_async(text: str, findings: List[Finding]) -> Dict[str, Any]:
+    """Async variant of get_gpt_ecg_interpretation that does not block the event loop."""
+    prompt = _build_ecg_prompt(text, findings)
+    key = prompt_key(prompt)
+    # The cache may be SQLite-backed, so it is read and written off the loop
+    cached = await asyncio.to_thread(_gpt_cache.get, key)
+    if cached is not None:
+        return cached
+    try:
+        response = await aclient.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_ecg_messages(prompt),
+            response_format={"type": "json_object"},  # JSON mode: body is always parseable
+            timeout=15
+        )
+        parsed = json.loads(response.choices[0].message.content)
+        await asyncio.to_thread(_gpt_cache.put, key, parsed)
+        return parsed
+    except:
+        pass
+    
+    return _fallback_ecg_interpretation()
+
+
+def get_gpt_ecg_interpretations_batch(items: List[Tuple[str, List[Finding]]]) -> List[Dict[str, Any]]:
+    """Interpret several ECGs with a single GPT request, one result per item."""
+    if not items:
+        return []
+    
+    try:
+        sections = "\n".join(
+            f'## ECG {i}:\nECG Description: "{text}"\n\nIdentified findings:\n{_summarize_ecg_findings(findings)}'
+            for i, (text, findings) in enumerate(items, 1)
+        )
+        prompt = (
+            f"You are a cardiologist interpreting {len(items)} ECGs.\n\n{sections}\n\n"
+            f'Return a JSON object {{"interpretations": [...]}} whose array has length {len(items)}, '
+            f"one object per ECG above in order:\n{_ECG_RESPONSE_SCHEMA}\n\nReturn ONLY valid JSON."
+        )
+        response = client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": "You are a cardiologist. Reply as JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            timeout=15 + 5 * len(items)
+        )
+        results = json.loads(response.choices[0].message.content)["interpretations"]
+        if len(results) == len(items) and all(isinstance(r, dict) for r in results):
+            return results
+    except:
+        pass
+    
+    return [_fallback_ecg_interpretation() for _ in items]
 
 
 def cardiologist_agent(ecg_text: str) -> Dict[str, Any]:
     """Main cardiologist agent function for ECG interpretation."""
+    report = _local_cardiac_report(ecg_text)
+    if report is not None:
+        return report
+    
+    # STEP 2: Standard pattern matching
+    findings = extract_ecg_findings(ecg_text)
+    hypotheses = build_cardiac_hypotheses(findings)
+    gpt_result = get_gpt_ecg_interpretation(ecg_text, findings)
+    return _assemble_cardiac_report(ecg_text, findings, hypotheses, gpt_result)
+
+
+async def cardiologist_agent_async(ecg_text: str) -> Dict[str, Any]:
+    """
+    Async cardiologist agent. Pattern matching and hypothesis building run in
+    worker threads, so the event loop stays free to send the GPT request,
+    which is started as soon as findings are known.
+    """
+    report = await asyncio.to_thread(_local_cardiac_report, ecg_text)
+    if report is not None:
+        return report
+    
+    findings = await asyncio.to_thread(extract_ecg_findings, ecg_text)
+    gpt_task = asyncio.create_task(get_gpt_ecg_interpretation_async(ecg_text, findings))
+    hypotheses = await asyncio.to_thread(build_cardiac_hypotheses, findings)
+    return _assemble_cardiac_report(ecg_text, findings, hypotheses, await gpt_task)
+
+
+def cardiologist_agent_batch(ecg_texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Interpret several ECGs together. Pattern matching runs in a thread pool and
+    every report that needs GPT shares one request, amortising the round-trip.
+    """
+    reports: List[Optional[Dict[str, Any]]] = [_local_cardiac_report(text) for text in ecg_texts]
+    pending = [i for i, report in enumerate(reports) if report is None]
+    
+    with ThreadPoolExecutor() as pool:
+        all_findings = list(pool.map(extract_ecg_findings, [ecg_texts[i] for i in pending]))
+    
+    gpt_results = get_gpt_ecg_interpretations_batch(
+        [(ecg_texts[i], findings) for i, findings in zip(pending, all_findings)]
+    )
+    for i, findings, gpt_result in zip(pending, all_findings, gpt_results):
+        hypotheses = build_cardiac_hypotheses(findings)
+        reports[i] = _assemble_cardiac_report(ecg_texts[i], findings, hypotheses, gpt_result)
+    return reports
+
+
+def _local_cardiac_report(ecg_text: str) -> Optional[Dict[str, Any]]:
+    """Return the report for empty input or a definitive finding, else None."""
     if not ecg_text or not ecg_text.strip():
         return {
             "agent": "cardiologist",
@@ -489,11 +879,15 @@ def cardiologist_agent(ecg_text: str) -> Dict[str, Any]:
             "diagnostic_certainty": "confirmed"
         }
     
-    # STEP 2: Standard pattern matching
-    findings = extract_ecg_findings(ecg_text)
-    hypotheses = build_cardiac_hypotheses(findings)
-    gpt_result = get_gpt_ecg_interpretation(ecg_text, findings)
-    
+    return None
+
+
+def _assemble_cardiac_report(
+    ecg_text: str,
+    findings: List[Finding],
+    hypotheses: List[DiagnosticHypothesis],
+    gpt_result: Dict[str, Any]
+) -> Dict[str, Any]:
     if hypotheses:
         top = hypotheses[0]
         primary_impression = f"{top.diagnosis} (probability: {top.probability:.0%})"
@@ -13,7 +13,26 @@ Key Features:
 """
 
 import json
-from typing import Dict, Any, List, Tuple, Optional
+import re
+from functools import lru_cache
+from heapq import nlargest
+from operator import itemgetter
+from typing import Dict, Any, Iterable, List, Tuple, Optional
+
+try:
+    import orjson  # Optional: faster JSON parsing
+except ImportError:
+    orjson = None
+
+try:
+    import numpy as np  # Optional: vectorised reductions for large agent panels
+except ImportError:
+    np = None
+
+try:
+    from numba import njit  # Optional: compiled reduction kernel
+except ImportError:
+    njit = None
 
 # ============================================================================
 # AGENT WEIGHTS - Based on diagnostic relevance for different conditions
@@ -35,6 +54,28 @@ CONDITION_WEIGHTS = {
     "COPD Exacerbation": {"pulmonologist": 1.4, "radiologist": 1.0, "pathologist": 0.8, "cardiologist": 0.6},
 }
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _loads_object_at(text: str, start: int) -> Any:
+    """Decode the JSON object starting at text[start], ignoring anything after it."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text[start:] if start else text)
+        except orjson.JSONDecodeError:
+            pass  # Trailing prose after the object; fall back to raw_decode
+    return _JSON_DECODER.raw_decode(text, start)[0]
+
+# (condition, agent) -> weight, with base weights already folded in
+_WEIGHT_TABLE = {
+    (condition, agent): agent_weights.get(agent, AGENT_BASE_WEIGHTS.get(agent, 1.0))
+    for condition, agent_weights in CONDITION_WEIGHTS.items()
+    for agent in AGENT_BASE_WEIGHTS.keys() | agent_weights.keys()
+}
+
+# Below this many agents, building arrays costs more than the Python reductions
+_NUMPY_MIN_AGENTS = 16
+
 
 def _safe_parse_report(report: Any) -> Dict[str, Any]:
     """Normalize agent report into consistent format."""
@@ -43,9 +84,8 @@ def _safe_parse_report(report: Any) -> Dict[str, Any]:
     try:
         if isinstance(report, str):
             start = report.find("{")
-            end = report.rfind("}")
-            if start != -1 and end > start:
-                return json.loads(report[start:end+1])
+            if start != -1:
+                return _loads_object_at(report, start)
     except:
         pass
     return {"diagnoses": {}, "confidence": 0.0}
@@ -53,83 +93,169 @@ def _safe_parse_report(report: Any) -> Dict[str, Any]:
 
 def get_condition_weight(condition: str, agent: str) -> float:
     """Get weight for an agent for a specific condition."""
-    if condition in CONDITION_WEIGHTS:
-        return CONDITION_WEIGHTS[condition].get(agent, AGENT_BASE_WEIGHTS.get(agent, 1.0))
-    return AGENT_BASE_WEIGHTS.get(agent, 1.0)
-
-
-def collect_all_hypotheses(agent_outputs: Dict[str, Dict]) -> Dict[str, List[Tuple[str, float, float]]]:
-    """Collect all diagnostic hypotheses from all agents."""
-    hypotheses: Dict[str, List[Tuple[str, float, float]]] = {}
-    for agent, output in agent_outputs.items():
-        parsed = _safe_parse_report(output)
-        diagnoses = parsed.get("diagnoses", {})
-        for diagnosis, prob in diagnoses.items():
-            try:
-                prob_val = float(prob)
-            except:
-                prob_val = 1.0 if str(prob).lower() in ["true", "yes", "positive"] else 0.0
-            weight = get_condition_weight(diagnosis, agent)
-            if diagnosis not in hypotheses:
-                hypotheses[diagnosis] = []
-            hypotheses[diagnosis].append((agent, prob_val, weight))
+    return _WEIGHT_TABLE.get((condition, agent), AGENT_BASE_WEIGHTS.get(agent, 1.0))
+
+
+def _parse_all(agent_outputs: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Parse every agent output exactly once."""
+    return {agent: _safe_parse_report(output) for agent, output in agent_outputs.items()}
+
+
+def collect_all_hypotheses(agent_outputs: Dict[str, Dict]) -> Dict[str, Dict[str, List]]:
+    """
+    Collect all diagnostic hypotheses from all agents, per diagnosis as parallel
+    "agents", "probs" and "weights" lists.
+    """
+    hypotheses: Dict[str, Dict[str, List]] = {}
+    for agent, parsed in _parse_all(agent_outputs).items():
+        _add_hypotheses(hypotheses, agent, parsed)
     return hypotheses
 
 
-def calculate_weighted_probability(agent_probs: List[Tuple[str, float, float]]) -> Tuple[float, float]:
+def _add_hypotheses(hypotheses: Dict[str, Dict[str, List]], agent: str, parsed: Dict) -> None:
+    diagnoses = parsed.get("diagnoses", {})
+    for diagnosis, prob in diagnoses.items():
+        try:
+            prob_val = float(prob)
+        except:
+            prob_val = 1.0 if str(prob).lower() in ["true", "yes", "positive"] else 0.0
+        weight = get_condition_weight(diagnosis, agent)
+        if diagnosis not in hypotheses:
+            hypotheses[diagnosis] = {"agents": [], "probs": [], "weights": []}
+        entry = hypotheses[diagnosis]
+        entry["agents"].append(agent)
+        entry["probs"].append(prob_val)
+        entry["weights"].append(weight)
+
+
+if njit is not None:
+    # Compiled on first call: only panels of _NUMPY_MIN_AGENTS or more reach it
+    @njit(cache=True)
+    def _weighted_stats(probs, weights):
+        """Total weight, weighted sum and population variance in one pass (Welford)."""
+        total_weight = 0.0
+        weighted_sum = 0.0
+        mean = 0.0
+        m2 = 0.0
+        for i in range(probs.shape[0]):
+            p = probs[i]
+            total_weight += weights[i]
+            weighted_sum += p * weights[i]
+            d = p - mean
+            mean += d / (i + 1)
+            m2 += d * (p - mean)
+        return total_weight, weighted_sum, m2 / probs.shape[0]
+else:
+    _weighted_stats = None
+
+
+def calculate_weighted_probability(probs: List[float], weights: List[float]) -> Tuple[float, float]:
     """Calculate weighted average probability and agreement score."""
-    if not agent_probs:
+    if not probs:
         return 0.0, 0.0
-    total_weight = sum(w for _, _, w in agent_probs)
-    weighted_sum = sum(prob * weight for _, prob, weight in agent_probs)
-    weighted_prob = weighted_sum / total_weight if total_weight > 0 else 0.0
-    if len(agent_probs) > 1:
-        probs = [p for _, p, _ in agent_probs]
-        mean_prob = sum(probs) / len(probs)
-        variance = sum((p - mean_prob) ** 2 for p in probs) / len(probs)
-        agreement = max(0, 1 - (variance ** 0.5) * 2)
+    n = len(probs)
+    if np is not None and n >= _NUMPY_MIN_AGENTS:
+        p = np.fromiter(probs, dtype=np.float64, count=n)
+        w = np.fromiter(weights, dtype=np.float64, count=n)
+        if _weighted_stats is not None:
+            total_weight, weighted_sum, variance = _weighted_stats(p, w)
+        else:
+            total_weight = float(w.sum())
+            weighted_sum = float(p @ w)
+            variance = float(((p - p.mean()) ** 2).mean())
     else:
-        agreement = 0.5
+        # Single pass; Welford's update keeps the variance stable for near-equal probs
+        total_weight = weighted_sum = mean = m2 = 0.0
+        for i, (p, w) in enumerate(zip(probs, weights), 1):
+            total_weight += w
+            weighted_sum += p * w
+            d = p - mean
+            mean += d / i
+            m2 += d * (p - mean)
+        variance = m2 / n
+    weighted_prob = weighted_sum / total_weight if total_weight > 0 else 0.0
+    agreement = max(0, 1 - (variance ** 0.5) * 2) if n > 1 else 0.5
     return round(weighted_prob, 4), round(agreement, 3)
 
 
-def identify_supporting_agents(agent_probs: List[Tuple[str, float, float]], threshold: float = 0.3) -> List[str]:
+def identify_supporting_agents(agents: List[str], probs: List[float], threshold: float = 0.3) -> List[str]:
     """Identify which agents support a diagnosis."""
-    return [agent for agent, prob, _ in agent_probs if prob >= threshold]
+    return [agent for agent, prob in zip(agents, probs) if prob >= threshold]
 
 
 def collect_all_findings(agent_outputs: Dict[str, Dict]) -> List[Dict]:
     """Collect all findings from all agents."""
+    return _collect_findings_parsed(_parse_all(agent_outputs))
+
+
+def _collect_findings_parsed(parsed_outputs: Dict[str, Dict]) -> List[Dict]:
     all_findings = []
-    for agent, output in agent_outputs.items():
-        parsed = _safe_parse_report(output)
-        findings = parsed.get("findings", [])
-        for finding in findings:
-            if isinstance(finding, dict):
-                finding["source_agent"] = agent
-                all_findings.append(finding)
+    for agent, parsed in parsed_outputs.items():
+        _add_findings(all_findings, agent, parsed)
     return all_findings
 
 
+def _add_findings(all_findings: List[Dict], agent: str, parsed: Dict) -> None:
+    # Tag copies rather than mutating the agent's own finding dicts
+    all_findings.extend(
+        {**finding, "source_agent": agent}
+        for finding in parsed.get("findings", [])
+        if isinstance(finding, dict)
+    )
+
+
 def collect_all_flags(agent_outputs: Dict[str, Dict]) -> List[str]:
     """Collect all critical flags from agents."""
+    return _collect_flags_parsed(_parse_all(agent_outputs))
+
+
+def _collect_flags_parsed(parsed_outputs: Dict[str, Dict]) -> List[str]:
     all_flags = []
-    for agent, output in agent_outputs.items():
-        parsed = _safe_parse_report(output)
-        flags = parsed.get("flags", [])
-        for flag in flags:
-            all_flags.append(f"[{agent}] {flag}")
+    for agent, parsed in parsed_outputs.items():
+        _add_flags(all_flags, agent, parsed)
     return all_flags
 
 
+def _add_flags(all_flags: List[str], agent: str, parsed: Dict) -> None:
+    all_flags.extend([f"[{agent}] {flag}" for flag in parsed.get("flags", [])])
+
+
+def _collect_all(parsed_outputs: Dict[str, Dict]) -> Tuple[Dict[str, Dict[str, List]], List[Dict], List[str], List[float]]:
+    """Hypotheses, findings, flags and confidences in a single pass over the agents."""
+    hypotheses: Dict[str, Dict[str, List]] = {}
+    all_findings: List[Dict] = []
+    all_flags: List[str] = []
+    confidences: List[float] = []
+    for agent, parsed in parsed_outputs.items():
+        _add_hypotheses(hypotheses, agent, parsed)
+        _add_findings(all_findings, agent, parsed)
+        _add_flags(all_flags, agent, parsed)
+        try:
+            confidences.append(float(parsed.get("confidence", 0.5)))
+        except:
+            confidences.append(0.5)
+    return hypotheses, all_findings, all_flags, confidences
+
+
+CRITICAL_URGENCY_KEYWORDS = ["stemi", "embolism", "tamponade", "shock", "arrest", "critical"]
+HIGH_URGENCY_KEYWORDS = ["nstemi", "failure", "effusion", "tuberculosis"]
+
+# One alternation per tier so each tier is a single pass over the text
+_CRITICAL_URGENCY_RE = re.compile("|".join(map(re.escape, CRITICAL_URGENCY_KEYWORDS)))
+_HIGH_URGENCY_RE = re.compile("|".join(map(re.escape, HIGH_URGENCY_KEYWORDS)))
+
+
 def determine_urgency(top_diagnosis: str, flags: List[str]) -> str:
     """Determine overall case urgency."""
-    critical_keywords = ["stemi", "embolism", "tamponade", "shock", "arrest", "critical"]
+    return _urgency_cached(top_diagnosis, tuple(flags))
+
+
+@lru_cache(maxsize=1024)
+def _urgency_cached(top_diagnosis: str, flags: Tuple[str, ...]) -> str:
     combined = (top_diagnosis + " ".join(flags)).lower()
-    if any(kw in combined for kw in critical_keywords):
+    if _CRITICAL_URGENCY_RE.search(combined):
         return "critical"
-    high_keywords = ["nstemi", "failure", "effusion", "tuberculosis"]
-    if any(kw in combined for kw in high_keywords):
+    if _HIGH_URGENCY_RE.search(combined):
         return "high"
     return "moderate"
 
@@ -141,14 +267,20 @@ def check_for_definitive_diagnosis(agent_outputs: Dict[str, Any]) -> Optional[Di
     
     Example: CTPA filling defect = PE confirmed (not suspected)
     """
-    for agent, output in agent_outputs.items():
-        parsed = _safe_parse_report(output)
-        
+    # Parse lazily so agents after the first definitive report are never touched
+    return _check_definitive_parsed(
+        (agent, _safe_parse_report(output)) for agent, output in agent_outputs.items()
+    )
+
+
+def _check_definitive_parsed(parsed_items: Iterable[Tuple[str, Dict]]) -> Optional[Dict[str, Any]]:
+    """Return the first definitive diagnosis among (agent, parsed report) pairs."""
+    for agent, parsed in parsed_items:
         # Check for definitive finding flag
         if parsed.get("is_definitive") or parsed.get("diagnostic_certainty") == "confirmed":
             diagnoses = parsed.get("diagnoses", {})
             if diagnoses:
-                top_diagnosis = max(diagnoses.keys(), key=lambda k: diagnoses[k])
+                top_diagnosis = max(diagnoses.items(), key=itemgetter(1))[0]
                 return {
                     "diagnosis": top_diagnosis,
                     "confidence": parsed.get("confidence", 0.95),
@@ -172,11 +304,12 @@ def build_final_diagnosis(agent_outputs: Dict[str, Any]) -> Dict[str, Any]:
     # STEP 1: Check for DEFINITIVE diagnosis from any agent
     # When a gold-standard test confirms diagnosis, we don't need probability
     # =========================================================================
-    definitive = check_for_definitive_diagnosis(agent_outputs)
+    parsed_outputs = _parse_all(agent_outputs)
+    definitive = _check_definitive_parsed(parsed_outputs.items())
     
     if definitive:
-        all_findings = collect_all_findings(agent_outputs)
-        all_flags = collect_all_flags(agent_outputs)
+        all_findings = _collect_findings_parsed(parsed_outputs)
+        all_flags = _collect_flags_parsed(parsed_outputs)
         
         return {
             "diagnosis": {
@@ -196,48 +329,38 @@ def build_final_diagnosis(agent_outputs: Dict[str, Any]) -> Dict[str, Any]:
             "confirmation_source": definitive["confirmed_by"],
             "explanation": definitive["explanation"],
             "is_definitive": True,
-            "agent_confidences": {agent: round(_safe_parse_report(out).get("confidence", 0.5), 3) for agent, out in agent_outputs.items()},
+            "agent_confidences": {agent: round(parsed.get("confidence", 0.5), 3) for agent, parsed in parsed_outputs.items()},
         }
     
     # =========================================================================
     # STEP 2: Standard probability-based consensus for non-definitive cases
     # =========================================================================
-    all_hypotheses = collect_all_hypotheses(agent_outputs)
+    all_hypotheses, all_findings, all_flags, confidences = _collect_all(parsed_outputs)
     diagnosis_scores = {}
     
-    for diagnosis, agent_probs in all_hypotheses.items():
-        weighted_prob, agreement = calculate_weighted_probability(agent_probs)
-        supporting_agents = identify_supporting_agents(agent_probs)
+    for diagnosis, entry in all_hypotheses.items():
+        agents, probs = entry["agents"], entry["probs"]
+        weighted_prob, agreement = calculate_weighted_probability(probs, entry["weights"])
+        supporting_agents = identify_supporting_agents(agents, probs)
         agreement_boost = 1.0 + (agreement * 0.2) if len(supporting_agents) > 1 else 1.0
         final_prob = min(0.95, weighted_prob * agreement_boost)
         diagnosis_scores[diagnosis] = {
             "probability": round(final_prob, 4),
             "agreement": agreement,
             "supporting_agents": supporting_agents,
-            "agent_details": [(a, round(p, 3)) for a, p, _ in agent_probs]
+            "agent_details": [(a, round(p, 3)) for a, p in zip(agents, probs)]
         }
     
     if diagnosis_scores:
-        sorted_diagnoses = sorted(diagnosis_scores.items(), key=lambda x: x[1]["probability"], reverse=True)
-        top_diagnosis = sorted_diagnoses[0][0]
-        top_info = sorted_diagnoses[0][1]
-        differentials = [{"diagnosis": d, "probability": info["probability"]} for d, info in sorted_diagnoses[1:4] if info["probability"] > 0.15]
+        # Only the top diagnosis and three differentials are used
+        top4 = nlargest(4, diagnosis_scores.items(), key=lambda x: x[1]["probability"])
+        top_diagnosis, top_info = top4[0]
+        differentials = [{"diagnosis": d, "probability": info["probability"]} for d, info in top4[1:] if info["probability"] > 0.15]
     else:
         top_diagnosis = "No significant diagnosis identified"
         top_info = {"probability": 0.0, "agreement": 0.0, "supporting_agents": []}
         differentials = []
     
-    all_findings = collect_all_findings(agent_outputs)
-    all_flags = collect_all_flags(agent_outputs)
-    
-    confidences = []
-    for output in agent_outputs.values():
-        parsed = _safe_parse_report(output)
-        try:
-            confidences.append(float(parsed.get("confidence", 0.5)))
-        except:
-            confidences.append(0.5)
-    
     avg_confidence = sum(confidences) / len(confidences) if confidences else 0.5
     agreement_factor = top_info.get("agreement", 0.5)
     final_confidence = round(avg_confidence * 0.7 + agreement_factor * 0.3, 3)
@@ -257,5 +380,5 @@ def build_final_diagnosis(agent_outputs: Dict[str, Any]) -> Dict[str, Any]:
         "all_findings": all_findings[:10],
         "critical_flags": all_flags,
         "agents_used": list(agent_outputs.keys()),
-        "agent_confidences": {agent: round(_safe_parse_report(out).get("confidence", 0.5), 3) for agent, out in agent_outputs.items()},
+        "agent_confidences": {agent: round(parsed.get("confidence", 0.5), 3) for agent, parsed in parsed_outputs.items()},
     }
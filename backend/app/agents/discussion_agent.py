@@ -1,13 +1,34 @@
 import json
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Tuple, Optional
 from openai import OpenAI
+from pydantic import BaseModel, Field
 import os
 
+try:
+    import orjson  # Optional: faster JSON parsing
+except ImportError:
+    orjson = None
+
 # ---------------------------------------------------------
 # OpenAI Client
 # ---------------------------------------------------------
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _loads_object_at(text: str, start: int) -> Any:
+    """Decode the JSON object starting at text[start], ignoring anything after it."""
+    if orjson is not None:
+        try:
+            return orjson.loads(text[start:] if start else text)
+        except orjson.JSONDecodeError:
+            pass  # Trailing prose after the object; fall back to raw_decode
+    return _JSON_DECODER.raw_decode(text, start)[0]
+
+
 # =========================================================
 # SAFE PARSING
 # =========================================================
@@ -17,9 +38,8 @@ def _safe_parse_report(report: Any) -> Dict[str, Any]:
 
     try:
         if isinstance(report, str):
-            s, e = report.find("{"), report.rfind("}")
-            block = report[s:e+1] if s != -1 and e > s else report
-            data = json.loads(block)
+            s = report.find("{")
+            data = _loads_object_at(report, s) if s != -1 else json.loads(report)
         elif isinstance(report, dict):
             data = report
         else:
@@ -57,8 +77,21 @@ def _safe_parse_report(report: Any) -> Dict[str, Any]:
 # =========================================================
 # UTIL
 # =========================================================
+_TRUE_WORDS = frozenset({"true", "positive", "yes"})
+_FALSE_WORDS = frozenset({"false", "negative", "no", "0", ""})
+
+
 def _bin(v: Any) -> int:
     """Normalize any truth-like value to 0/1."""
+    # Fast paths for the common vote types; anything else takes the int() route
+    if isinstance(v, int):
+        return 1 if v >= 1 else 0
+    if isinstance(v, str):
+        lowered = v.lower()
+        if lowered in _TRUE_WORDS:
+            return 1
+        if lowered in _FALSE_WORDS:
+            return 0
     try:
         iv = int(v)
         return 1 if iv >= 1 else 0
@@ -71,15 +104,23 @@ def _bin(v: Any) -> int:
 # =========================================================
 def _detect_conflicts(reports: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
     tallies: Dict[str, Dict[str, int]] = {}
+    # Bit 1 = someone voted 0, bit 2 = someone voted 1; 3 means disagreement
+    seen: Dict[str, int] = {}
 
     for agent, rep in reports.items():
         for label, val in rep.get("labels", {}).items():
-            tallies.setdefault(label, {})[agent] = _bin(val)
+            vote = _bin(val)
+            if label in tallies:
+                tallies[label][agent] = vote
+                seen[label] |= 1 << vote
+            else:
+                tallies[label] = {agent: vote}
+                seen[label] = 1 << vote
 
     return [
         {"label": lbl, "votes": votes}
         for lbl, votes in tallies.items()
-        if set(votes.values()) == {0, 1}
+        if seen[lbl] == 3
     ]
 
 
@@ -87,7 +128,7 @@ def _detect_conflicts(reports: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]
 # MAJORITY CONSENSUS
 # =========================================================
 def _majority_consensus(reports: Dict[str, Dict[str, Any]]):
-    votes: Dict[str, List[int]] = {}
+    votes: Dict[str, List[int]] = defaultdict(list)
     confs, explanations = [], []
 
     for rep in reports.values():
@@ -97,9 +138,10 @@ def _majority_consensus(reports: Dict[str, Dict[str, Any]]):
             confs.append(float(rep["confidence"]))
 
         for label, val in rep.get("labels", {}).items():
-            votes.setdefault(label, []).append(_bin(val))
+            votes[label].append(_bin(val))
 
-    result = {lbl: 1 if sum(v) >= len(v)/2 else 0 for lbl, v in votes.items()}
+    # Integer form of sum(v) >= len(v) / 2: ties still count as positive
+    result = {lbl: 1 if 2 * sum(v) >= len(v) else 0 for lbl, v in votes.items()}
     avg_conf = round(sum(confs)/len(confs), 3) if confs else 0.5
 
     return result, avg_conf, explanations
@@ -129,22 +171,59 @@ def _clarification_prompts(conflicts, symptoms, labs):
 # =========================================================
 def _extract_json(text: str) -> Dict[str, Any]:
     try:
-        s, e = text.find("{"), text.rfind("}")
-        return json.loads(text[s:e+1])
+        return _loads_object_at(text, text.index("{"))
     except:
         return {"error": "parse_failed", "raw": text}
 
 
-def _debate_turn(agent: str, report: Dict, others: Dict[str, Dict]):
+class DebateRevision(BaseModel):
+    """Shape of one agent's revision, enforced on the model via structured outputs."""
+    revised_labels: Dict[str, int]
+    revised_confidence: float = Field(ge=0, le=1)
+    explanation: str
+
+
+# Not strict: strict schemas cannot express the free-form label map
+_DEBATE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "debate_revision", "schema": DebateRevision.model_json_schema()}
+}
+
+
+def _parse_revision(text: str) -> Dict[str, Any]:
+    """Decode a structured-output reply directly, scanning for braces only if that fails."""
+    try:
+        data = orjson.loads(text) if orjson is not None else json.loads(text)
+        if isinstance(data, dict):
+            return data
+    except:
+        pass
+    return _extract_json(text)
+
+
+_COMPACT = (",", ":")
+
+
+def _others_json(agent: str, dumped: Dict[str, str]) -> str:
+    """
+    Same text as json.dumps(others, separators=_COMPACT), stitched from per-agent
+    dumps so each report is serialized once per round rather than once per reader.
+    """
+    return "{" + ",".join(
+        json.dumps(k) + ":" + v for k, v in dumped.items() if k != agent
+    ) + "}"
+
+
+def _debate_turn(agent: str, report_json: str, others_json: str):
     """One agent re-evaluates after reading others."""
     prompt = f"""
 You are the **{agent}** in a medical diagnostic committee.
 
 Your report:
-{json.dumps(report, indent=2)}
+{report_json}
 
 Other agents:
-{json.dumps(others, indent=2)}
+{others_json}
 
 Identify disagreements, reconsider your opinion, and revise your labels only if justified.
 
@@ -158,10 +237,11 @@ Respond ONLY in JSON:
 
     res = client.chat.completions.create(
         model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}]
+        messages=[{"role": "user", "content": prompt}],
+        response_format=_DEBATE_RESPONSE_FORMAT
     )
 
-    return _extract_json(res.choices[0].message.content)
+    return _parse_revision(res.choices[0].message.content)
 
 
 def run_debate(prior_reports: Dict[str, Any], turns: int = 2):
@@ -172,10 +252,17 @@ def run_debate(prior_reports: Dict[str, Any], turns: int = 2):
     for t in range(1, turns + 1):
         step = {"round": t, "agents": {}}
 
-        for agent, rep in current.items():
-            others = {k: v for k, v in current.items() if k != agent}
-            updated = _debate_turn(agent, rep, others)
-            step["agents"][agent] = updated
+        # Turns only read this round's reports, so the HTTP calls can overlap
+        agents = list(current)
+        # Compact separators: the model doesn't need the whitespace, and it costs tokens
+        dumped = {agent: json.dumps(rep, separators=_COMPACT) for agent, rep in current.items()}
+        with ThreadPoolExecutor(max_workers=max(len(agents), 1)) as pool:
+            updates = pool.map(
+                lambda agent: _debate_turn(agent, dumped[agent], _others_json(agent, dumped)),
+                agents
+            )
+            for agent, updated in zip(agents, updates):
+                step["agents"][agent] = updated
 
         # apply updates
         for agent, upd in step["agents"].items():
@@ -14,7 +14,9 @@ Key Lab Categories:
 """
 
 import re
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+from itertools import islice
+from typing import Dict, List, Any, Optional, Set, Tuple
 from app.core.evidence_layer import (
     Evidence, Finding, DiagnosticHypothesis,
     EvidenceType, EvidenceStrength, Severity, calculate_confidence
@@ -23,6 +25,17 @@ from app.core.disease_modules import (
     PNEUMONIA, COPD_EXACERBATION, PULMONARY_EMBOLISM,
     STEMI, NSTEMI, HEART_FAILURE
 )
+from app.core.utils import hyperscan_compatible, hyperscan_scan_records, required_literals
+
+try:
+    import hyperscan  # Optional: multi-pattern DFA scanner
+except ImportError:
+    hyperscan = None
+
+try:
+    import ahocorasick  # Optional: keyword/anchor scanner
+except ImportError:
+    ahocorasick = None
 
 # ============================================================================
 # LABORATORY PATTERN RECOGNITION
@@ -242,88 +255,278 @@ LAB_PATTERNS = {
     }
 }
 
+# Patterns run case-sensitively against lowered text, so they must be lowercase
+assert all(p == p.lower() for config in LAB_PATTERNS.values() for p in config["patterns"])
+
+
+def _split_lab_patterns():
+    """
+    Separate plain keywords ("leukocytosis", "aki") from real regexes. Keywords
+    are found with one literal scan; only the rest go through the regex engine.
+    """
+    keys_by_literal: Dict[str, List[str]] = {}
+    regexes: Dict[str, List[str]] = {}
+    for key, config in LAB_PATTERNS.items():
+        for pattern in config["patterns"]:
+            if re.escape(pattern) == pattern:
+                keys_by_literal.setdefault(pattern, []).append(key)
+            else:
+                regexes.setdefault(key, []).append(pattern)
+    return keys_by_literal, regexes
+
+
+_LAB_KEYS_BY_LITERAL, _LAB_REGEX_SOURCES = _split_lab_patterns()
+
+# Compiled once at import so the per-request path never touches the re cache
+_COMPILED_LAB = {
+    key: [re.compile(p) for p in patterns]
+    for key, patterns in _LAB_REGEX_SOURCES.items()
+}
+
+
+def _index_lab_regexes():
+    """
+    Index every regex under the literals it cannot match without, so a report
+    only runs the regexes whose anchor actually occurs in it (e.g. nothing
+    mentioning "dimer" ever runs the D-dimer patterns).
+    """
+    patterns_by_anchor: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+    ungated: List[Tuple[str, re.Pattern]] = []
+    for key, patterns in _COMPILED_LAB.items():
+        for pat in patterns:
+            anchors = required_literals(pat.pattern)
+            if anchors is None:
+                ungated.append((key, pat))
+                continue
+            for anchor in anchors:
+                patterns_by_anchor.setdefault(anchor, []).append((key, pat))
+    return patterns_by_anchor, ungated
+
+
+_LAB_PATTERNS_BY_ANCHOR, _LAB_UNGATED_PATTERNS = _index_lab_regexes()
+_LAB_WORDS = tuple({**_LAB_KEYS_BY_LITERAL, **_LAB_PATTERNS_BY_ANCHOR})
+
+
+def _build_lab_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for word in _LAB_WORDS:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+_LAB_AUTOMATON = _build_lab_automaton()
+
+
+def _build_lab_hyperscan_db(flags: int):
+    """Compile every lab pattern into one Hyperscan database, if available."""
+    if hyperscan is None:
+        return None, ()
+    keys = []
+    expressions = []
+    for key, config in LAB_PATTERNS.items():
+        for pattern in config["patterns"]:
+            keys.append(key)
+            expressions.append(pattern.encode())
+    db = hyperscan.Database()
+    try:
+        db.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=flags
+        )
+    except hyperscan.error:
+        return None, ()
+    return db, tuple(keys)
+
+
+_LAB_HS_DB, _LAB_HS_KEYS = _build_lab_hyperscan_db(hyperscan and hyperscan.HS_FLAG_SINGLEMATCH)
+# Batched scans need match start offsets to bucket hits back into records
+_LAB_HS_BATCH_DB, _ = _build_lab_hyperscan_db(hyperscan and hyperscan.HS_FLAG_SOM_LEFTMOST)
+_hs_local = threading.local()  # Hyperscan scratch space is not thread-safe
+
+
+def _on_hyperscan_match(pattern_id: int, start: int, end: int, flags: int, hits: Set[int]) -> None:
+    hits.add(pattern_id)
+
+
+def _present_lab_words(text_lower: str) -> Set[str]:
+    """Keywords and regex anchors occurring in the text."""
+    if _LAB_AUTOMATON is not None:
+        return {word for _, word in _LAB_AUTOMATON.iter(text_lower)}
+    return {word for word in _LAB_WORDS if word in text_lower}
+
+
+def _match_lab_keys(text_lower: str) -> Set[str]:
+    """Keys of every LAB_PATTERNS entry with a pattern occurring in the text."""
+    if _LAB_HS_DB is not None and hyperscan_compatible(text_lower):
+        scratch = getattr(_hs_local, "scratch", None)
+        if scratch is None:
+            scratch = _hs_local.scratch = hyperscan.Scratch(_LAB_HS_DB)
+        hits: Set[int] = set()
+        _LAB_HS_DB.scan(text_lower.encode(), match_event_handler=_on_hyperscan_match, context=hits, scratch=scratch)
+        return {_LAB_HS_KEYS[pattern_id] for pattern_id in hits}
+
+    present = _present_lab_words(text_lower)
+    matched_keys = set()
+    for word in present:
+        matched_keys.update(_LAB_KEYS_BY_LITERAL.get(word, ()))
+
+    candidates = [
+        entry for word in present for entry in _LAB_PATTERNS_BY_ANCHOR.get(word, ())
+    ]
+    for key, pat in candidates + _LAB_UNGATED_PATTERNS:
+        if key not in matched_keys and pat.search(text_lower):
+            matched_keys.add(key)
+    return matched_keys
+
+
+def _match_lab_keys_batch(texts_lower: List[str]) -> List[Set[str]]:
+    """_match_lab_keys for many texts, sharing one Hyperscan call where possible."""
+    matched: List[Optional[Set[str]]] = [None] * len(texts_lower)
+    if _LAB_HS_BATCH_DB is not None:
+        batch = [i for i, text in enumerate(texts_lower) if hyperscan_compatible(text)]
+        if batch:
+            scratch = getattr(_hs_local, "batch_scratch", None)
+            if scratch is None:
+                scratch = _hs_local.batch_scratch = hyperscan.Scratch(_LAB_HS_BATCH_DB)
+            ids_per_text = hyperscan_scan_records(_LAB_HS_BATCH_DB, scratch, [texts_lower[i] for i in batch])
+            for i, ids in zip(batch, ids_per_text):
+                if ids is not None:
+                    matched[i] = {_LAB_HS_KEYS[pattern_id] for pattern_id in ids}
+    return [
+        keys if keys is not None else _match_lab_keys(text)
+        for keys, text in zip(matched, texts_lower)
+    ]
+
+
+_STRONG_SEVERITIES = frozenset({Severity.HIGH, Severity.CRITICAL})
+
+# Evidence strength per entry, decided once rather than on every match
+_LAB_STRENGTH = {
+    key: EvidenceStrength.STRONG if config["severity"] in _STRONG_SEVERITIES else EvidenceStrength.MODERATE
+    for key, config in LAB_PATTERNS.items()
+}
+
+
+# (key, finding, significance, severity, evidence) in LAB_PATTERNS order. Evidence
+# is frozen, so each entry's template instance is shared by every finding.
+_LAB_ITEMS = tuple(
+    (
+        key,
+        config["finding"],
+        config["significance"],
+        config["severity"],
+        Evidence(
+            type=EvidenceType.LAB,
+            description=f"Lab finding: {config['finding']}",
+            value=config["finding"],
+            normal_range=config.get("normal_range"),
+            is_abnormal=True,
+            strength=_LAB_STRENGTH[key],
+            source="laboratory_results"
+        )
+    )
+    for key, config in LAB_PATTERNS.items()
+)
+
 
 def extract_lab_findings(text: str) -> List[Finding]:
     """Extract laboratory findings from text."""
+    return _findings_for_keys(_match_lab_keys(text.lower()))
+
+
+def _findings_for_keys(matched_keys: Set[str]) -> List[Finding]:
     findings = []
-    text_lower = text.lower()
-    matched_keys = set()
-    
-    for key, config in LAB_PATTERNS.items():
-        if key in matched_keys:
+    for key, name, significance, severity, evidence in _LAB_ITEMS:
+        if key not in matched_keys:
             continue
-        for pattern in config["patterns"]:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                evidence = Evidence(
-                    type=EvidenceType.LAB,
-                    description=f"Lab finding: {config['finding']}",
-                    value=config["finding"],
-                    normal_range=config.get("normal_range"),
-                    is_abnormal=True,
-                    strength=EvidenceStrength.STRONG if config["severity"] in [Severity.HIGH, Severity.CRITICAL] else EvidenceStrength.MODERATE,
-                    source="laboratory_results"
-                )
-                finding = Finding(
-                    name=config["finding"],
-                    present=True,
-                    evidence=[evidence],
-                    clinical_significance=config["significance"],
-                    severity=config["severity"]
-                )
-                findings.append(finding)
-                matched_keys.add(key)
-                break
-    
+        finding = Finding(
+            name=name,
+            present=True,
+            evidence=[evidence],
+            clinical_significance=significance,
+            severity=severity
+        )
+        findings.append(finding)
+
     return findings
 
 
+# Finding name -> disease keys it supports (finding names are unique per entry)
+FINDING_TO_DISEASES: Dict[str, List[str]] = {
+    config["finding"]: config["diseases"] for config in LAB_PATTERNS.values()
+}
+
+_DISEASE_MAP = {
+    "pneumonia": PNEUMONIA,
+    "copd": COPD_EXACERBATION,
+    "pulmonary_embolism": PULMONARY_EMBOLISM,
+    "stemi": STEMI,
+    "nstemi": NSTEMI,
+    "heart_failure": HEART_FAILURE
+}
+
+# Diseases are interned to small ints so per-finding scoring indexes flat lists
+_DISEASE_MODS = tuple(_DISEASE_MAP.values())
+DISEASE_IDS: Dict[str, int] = {key: i for i, key in enumerate(_DISEASE_MAP)}
+
+# Finding name -> ids of the mapped diseases it supports
+_FINDING_TO_DISEASE_IDS: Dict[str, Tuple[int, ...]] = {
+    name: tuple(DISEASE_IDS[d] for d in diseases if d in DISEASE_IDS)
+    for name, diseases in FINDING_TO_DISEASES.items()
+}
+
+# (criterion, lowered lab name) pairs per disease id so matching never re-lowers the criteria
+_DISEASE_LOWER_CRITERIA = tuple(
+    tuple((f"{lab}: {threshold}", lab.lower()) for lab, threshold in disease.lab_findings.items())
+    for disease in _DISEASE_MODS
+)
+
+# Leading lab criteria and differentials per disease id; copied into each hypothesis
+_DISEASE_REQUIRED_LABS = tuple(tuple(islice(disease.lab_findings.items(), 3)) for disease in _DISEASE_MODS)
+_DISEASE_DIFFERENTIALS = tuple(tuple(disease.differential_diagnoses[:3]) for disease in _DISEASE_MODS)
+_DISEASE_URGENCY = tuple(Severity(disease.default_urgency) for disease in _DISEASE_MODS)
+
+
 def build_lab_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothesis]:
     """Build diagnostic hypotheses based on lab findings."""
-    disease_scores: Dict[str, Dict] = {}
-    
-    disease_key_map = {
-        "pneumonia": PNEUMONIA,
-        "copd": COPD_EXACERBATION,
-        "pulmonary_embolism": PULMONARY_EMBOLISM,
-        "stemi": STEMI,
-        "nstemi": NSTEMI,
-        "heart_failure": HEART_FAILURE
-    }
+    n_diseases = len(_DISEASE_MODS)
+    disease_findings: List[Optional[List[str]]] = [None] * n_diseases
+    disease_evidence: List[Optional[list]] = [None] * n_diseases
+    has_critical = [False] * n_diseases
+    seen_order: List[int] = []  # First-seen order, kept for stable ties in the final sort
     
     for finding in findings:
-        for key, config in LAB_PATTERNS.items():
-            if finding.name == config["finding"]:
-                for disease_key in config["diseases"]:
-                    if disease_key not in disease_scores:
-                        disease_scores[disease_key] = {
-                            "findings": [],
-                            "evidence": [],
-                            "has_critical": False
-                        }
-                    disease_scores[disease_key]["findings"].append(finding.name)
-                    disease_scores[disease_key]["evidence"].extend(finding.evidence)
-                    if finding.severity == Severity.CRITICAL:
-                        disease_scores[disease_key]["has_critical"] = True
+        for disease_id in _FINDING_TO_DISEASE_IDS.get(finding.name, ()):
+            if disease_findings[disease_id] is None:
+                disease_findings[disease_id] = []
+                disease_evidence[disease_id] = []
+                seen_order.append(disease_id)
+            disease_findings[disease_id].append(finding.name)
+            disease_evidence[disease_id].extend(finding.evidence)
+            if finding.severity == Severity.CRITICAL:
+                has_critical[disease_id] = True
     
     hypotheses = []
-    for disease_key, score_data in disease_scores.items():
-        if disease_key not in disease_key_map:
-            continue
-        disease = disease_key_map[disease_key]
+    for disease_id in seen_order:
+        disease = _DISEASE_MODS[disease_id]
+        found = disease_findings[disease_id]
         
         # Check lab criteria match
-        criteria_met = []
-        for lab, threshold in disease.lab_findings.items():
-            if any(lab.lower() in f.lower() for f in score_data["findings"]):
-                criteria_met.append(f"{lab}: {threshold}")
+        found_lower = [f.lower() for f in found]
+        criteria_met = [c for c, lab_lower in _DISEASE_LOWER_CRITERIA[disease_id] if any(lab_lower in f for f in found_lower)]
         
         # Labs alone typically provide supportive evidence, not definitive diagnosis
-        finding_count = len(score_data["findings"])
+        finding_count = len(found)
         criteria_match = len(criteria_met) / max(len(disease.lab_findings), 1)
         probability = min(0.60, criteria_match * 0.35 + (finding_count * 0.08))
         
         # Critical findings boost probability
-        if score_data["has_critical"]:
+        if has_critical[disease_id]:
             probability = min(0.75, probability + 0.2)
         
         if probability > 0.15:
@@ -331,34 +534,66 @@ def build_lab_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothesis]:
                 diagnosis=disease.name,
                 icd10_code=disease.icd10_code,
                 probability=round(probability, 3),
-                supporting_evidence=score_data["evidence"],
-                required_for_diagnosis=list(disease.lab_findings.items())[:3],
+                supporting_evidence=disease_evidence[disease_id],
+                required_for_diagnosis=list(_DISEASE_REQUIRED_LABS[disease_id]),
                 criteria_met=criteria_met,
-                differential_diagnoses=disease.differential_diagnoses[:3],
+                differential_diagnoses=list(_DISEASE_DIFFERENTIALS[disease_id]),
                 recommended_workup=["Clinical correlation", "Imaging as indicated"],
-                urgency=Severity.CRITICAL if score_data["has_critical"] else Severity(disease.default_urgency)
+                urgency=Severity.CRITICAL if has_critical[disease_id] else _DISEASE_URGENCY[disease_id]
             ))
     
     hypotheses.sort(key=lambda h: h.probability, reverse=True)
     return hypotheses
 
 
+# Report for empty input; _empty_lab_report() gives each caller its own containers
+_EMPTY_LAB_REPORT = {
+    "agent": "pathologist",
+    "input_snippet": "",
+    "diagnoses": {},
+    "top_diagnosis": "No laboratory data provided",
+    "confidence": 0.0,
+    "explanation": "No laboratory results provided for interpretation",
+    "findings": (),
+    "hypotheses": (),
+    "flags": ("INCOMPLETE_DATA",)
+}
+
+
+def _empty_lab_report() -> Dict[str, Any]:
+    return {
+        **_EMPTY_LAB_REPORT,
+        "diagnoses": {},
+        "findings": [],
+        "hypotheses": [],
+        "flags": list(_EMPTY_LAB_REPORT["flags"])
+    }
+
+
 def pathologist_agent(lab_text: str) -> Dict[str, Any]:
     """Main pathologist agent function for laboratory interpretation."""
     if not lab_text or not lab_text.strip():
-        return {
-            "agent": "pathologist",
-            "input_snippet": "",
-            "diagnoses": {},
-            "top_diagnosis": "No laboratory data provided",
-            "confidence": 0.0,
-            "explanation": "No laboratory results provided for interpretation",
-            "findings": [],
-            "hypotheses": [],
-            "flags": ["INCOMPLETE_DATA"]
-        }
+        return _empty_lab_report()
     
-    findings = extract_lab_findings(lab_text)
+    return _assemble_lab_report(lab_text, extract_lab_findings(lab_text))
+
+
+def pathologist_agent_batch(lab_texts: List[str]) -> List[Dict[str, Any]]:
+    """Run the pathologist over many lab texts, sharing one pattern scan across them."""
+    reports: List[Optional[Dict[str, Any]]] = [None] * len(lab_texts)
+    pending = []
+    for i, text in enumerate(lab_texts):
+        if not text or not text.strip():
+            reports[i] = _empty_lab_report()
+        else:
+            pending.append(i)
+    keys_per_text = _match_lab_keys_batch([lab_texts[i].lower() for i in pending])
+    for i, matched_keys in zip(pending, keys_per_text):
+        reports[i] = _assemble_lab_report(lab_texts[i], _findings_for_keys(matched_keys))
+    return reports
+
+
+def _assemble_lab_report(lab_text: str, findings: List[Finding]) -> Dict[str, Any]:
     hypotheses = build_lab_hypotheses(findings)
     
     if hypotheses:
@@ -372,9 +607,19 @@ def pathologist_agent(lab_text: str) -> Dict[str, Any]:
         primary_impression = "No significant laboratory abnormality identified"
         explanation = "No concerning laboratory patterns identified in the provided text"
     
+    # Count severities and build flags for critical findings in one pass
+    critical_findings = high_findings = 0
+    flags = []
+    for finding in findings:
+        severity = finding.severity
+        if severity == Severity.CRITICAL:
+            critical_findings += 1
+            flags.append(f"CRITICAL: {finding.name} - Immediate clinical correlation required")
+        elif severity == Severity.HIGH:
+            high_findings += 1
+            flags.append(f"ALERT: {finding.name}")
+    
     # Calculate confidence
-    critical_findings = sum(1 for f in findings if f.severity == Severity.CRITICAL)
-    high_findings = sum(1 for f in findings if f.severity == Severity.HIGH)
     confidence = calculate_confidence(
         evidence_count=len(findings),
         strong_evidence_count=critical_findings + high_findings,
@@ -382,14 +627,6 @@ def pathologist_agent(lab_text: str) -> Dict[str, Any]:
         criteria_met_ratio=len(hypotheses) / 4 if hypotheses else 0.0
     ) if findings else 0.3
     
-    # Build flags for critical findings
-    flags = []
-    for finding in findings:
-        if finding.severity == Severity.CRITICAL:
-            flags.append(f"CRITICAL: {finding.name} - Immediate clinical correlation required")
-        elif finding.severity == Severity.HIGH:
-            flags.append(f"ALERT: {finding.name}")
-    
     return {
         "agent": "pathologist",
         "input_snippet": lab_text[:200],
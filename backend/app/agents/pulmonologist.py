@@ -15,7 +15,8 @@ Supported Conditions:
 """
 
 import re
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Optional, Set, Tuple
 from app.core.evidence_layer import (
     Evidence, Finding, DiagnosticHypothesis,
     EvidenceType, EvidenceStrength, Severity, calculate_confidence
@@ -24,6 +25,17 @@ from app.core.disease_modules import (
     PNEUMONIA, COPD_EXACERBATION, ASTHMA_EXACERBATION, 
     PULMONARY_EMBOLISM, TUBERCULOSIS
 )
+from app.core.utils import hyperscan_compatible, hyperscan_scan_records, required_literals
+
+try:
+    import hyperscan  # Optional: multi-pattern DFA scanner
+except ImportError:
+    hyperscan = None
+
+try:
+    import ahocorasick  # Optional: keyword/anchor scanner
+except ImportError:
+    ahocorasick = None
 
 # ============================================================================
 # SYMPTOM PATTERN RECOGNITION
@@ -229,75 +241,252 @@ SYMPTOM_PATTERNS = {
     }
 }
 
+# Patterns run case-sensitively against lowered text, so they must be lowercase
+assert all(p == p.lower() for config in SYMPTOM_PATTERNS.values() for p in config["patterns"])
+
+
+def _split_symptom_patterns():
+    """
+    Separate plain keywords ("hemoptysis", "phlegm") from real regexes. Keywords
+    are found with one literal scan; only the rest go through the regex engine.
+    """
+    keys_by_literal: Dict[str, List[str]] = {}
+    regexes: Dict[str, List[str]] = {}
+    for key, config in SYMPTOM_PATTERNS.items():
+        for pattern in config["patterns"]:
+            if re.escape(pattern) == pattern:
+                keys_by_literal.setdefault(pattern, []).append(key)
+            else:
+                regexes.setdefault(key, []).append(pattern)
+    return keys_by_literal, regexes
+
+
+_SYMPTOM_KEYS_BY_LITERAL, _SYMPTOM_REGEX_SOURCES = _split_symptom_patterns()
+
+# Compiled once at import so the per-request path never touches the re cache
+_COMPILED_SYMPTOMS = {
+    key: [re.compile(p) for p in patterns]
+    for key, patterns in _SYMPTOM_REGEX_SOURCES.items()
+}
+
+
+def _index_symptom_regexes():
+    """
+    Index every regex under the literals it cannot match without, so a history
+    only runs the regexes whose anchor actually occurs in it (e.g. nothing
+    mentioning "sputum" ever runs the sputum patterns).
+    """
+    patterns_by_anchor: Dict[str, List[Tuple[str, re.Pattern]]] = {}
+    ungated: List[Tuple[str, re.Pattern]] = []
+    for key, patterns in _COMPILED_SYMPTOMS.items():
+        for pat in patterns:
+            anchors = required_literals(pat.pattern)
+            if anchors is None:
+                ungated.append((key, pat))
+                continue
+            for anchor in anchors:
+                patterns_by_anchor.setdefault(anchor, []).append((key, pat))
+    return patterns_by_anchor, ungated
+
+
+_SYMPTOM_PATTERNS_BY_ANCHOR, _SYMPTOM_UNGATED_PATTERNS = _index_symptom_regexes()
+_SYMPTOM_WORDS = tuple({**_SYMPTOM_KEYS_BY_LITERAL, **_SYMPTOM_PATTERNS_BY_ANCHOR})
+
+
+def _build_symptom_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for word in _SYMPTOM_WORDS:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+_SYMPTOM_AUTOMATON = _build_symptom_automaton()
+
+
+def _build_symptom_hyperscan_db(flags: int):
+    """Compile every symptom pattern into one Hyperscan database, if available."""
+    if hyperscan is None:
+        return None, ()
+    keys = []
+    expressions = []
+    for key, config in SYMPTOM_PATTERNS.items():
+        for pattern in config["patterns"]:
+            keys.append(key)
+            expressions.append(pattern.encode())
+    db = hyperscan.Database()
+    try:
+        db.compile(
+            expressions=expressions,
+            ids=list(range(len(expressions))),
+            elements=len(expressions),
+            flags=flags
+        )
+    except hyperscan.error:
+        return None, ()
+    return db, tuple(keys)
+
+
+_SYMPTOM_HS_DB, _SYMPTOM_HS_KEYS = _build_symptom_hyperscan_db(hyperscan and hyperscan.HS_FLAG_SINGLEMATCH)
+# Batched scans need match start offsets to bucket hits back into records
+_SYMPTOM_HS_BATCH_DB, _ = _build_symptom_hyperscan_db(hyperscan and hyperscan.HS_FLAG_SOM_LEFTMOST)
+_hs_local = threading.local()  # Hyperscan scratch space is not thread-safe
+
+
+def _on_hyperscan_match(pattern_id: int, start: int, end: int, flags: int, hits: Set[int]) -> None:
+    hits.add(pattern_id)
+
+
+def _present_symptom_words(text_lower: str) -> Set[str]:
+    """Keywords and regex anchors occurring in the text."""
+    if _SYMPTOM_AUTOMATON is not None:
+        return {word for _, word in _SYMPTOM_AUTOMATON.iter(text_lower)}
+    return {word for word in _SYMPTOM_WORDS if word in text_lower}
+
+
+def _match_symptom_keys(text_lower: str) -> Set[str]:
+    """Keys of every SYMPTOM_PATTERNS entry with a pattern occurring in the text."""
+    if _SYMPTOM_HS_DB is not None and hyperscan_compatible(text_lower):
+        scratch = getattr(_hs_local, "scratch", None)
+        if scratch is None:
+            scratch = _hs_local.scratch = hyperscan.Scratch(_SYMPTOM_HS_DB)
+        hits: Set[int] = set()
+        _SYMPTOM_HS_DB.scan(text_lower.encode(), match_event_handler=_on_hyperscan_match, context=hits, scratch=scratch)
+        return {_SYMPTOM_HS_KEYS[pattern_id] for pattern_id in hits}
+
+    present = _present_symptom_words(text_lower)
+    matched_keys = set()
+    for word in present:
+        matched_keys.update(_SYMPTOM_KEYS_BY_LITERAL.get(word, ()))
+
+    candidates = [
+        entry for word in present for entry in _SYMPTOM_PATTERNS_BY_ANCHOR.get(word, ())
+    ]
+    for key, pat in candidates + _SYMPTOM_UNGATED_PATTERNS:
+        if key not in matched_keys and pat.search(text_lower):
+            matched_keys.add(key)
+    return matched_keys
+
+
+def _match_symptom_keys_batch(texts_lower: List[str]) -> List[Set[str]]:
+    """_match_symptom_keys for many texts, sharing one Hyperscan call where possible."""
+    matched: List[Optional[Set[str]]] = [None] * len(texts_lower)
+    if _SYMPTOM_HS_BATCH_DB is not None:
+        batch = [i for i, text in enumerate(texts_lower) if hyperscan_compatible(text)]
+        if batch:
+            scratch = getattr(_hs_local, "batch_scratch", None)
+            if scratch is None:
+                scratch = _hs_local.batch_scratch = hyperscan.Scratch(_SYMPTOM_HS_BATCH_DB)
+            ids_per_text = hyperscan_scan_records(_SYMPTOM_HS_BATCH_DB, scratch, [texts_lower[i] for i in batch])
+            for i, ids in zip(batch, ids_per_text):
+                if ids is not None:
+                    matched[i] = {_SYMPTOM_HS_KEYS[pattern_id] for pattern_id in ids}
+    return [
+        keys if keys is not None else _match_symptom_keys(text)
+        for keys, text in zip(matched, texts_lower)
+    ]
+
+
+# (key, finding, significance, severity, evidence) in SYMPTOM_PATTERNS order.
+# Evidence is frozen, so each entry's template instance is shared by every finding.
+_SYMPTOM_ITEMS = tuple(
+    (
+        key,
+        config["finding"],
+        config["significance"],
+        config["severity"],
+        Evidence(
+            type=EvidenceType.SYMPTOM,
+            description=f"Symptom identified: {config['finding']}",
+            value=config["finding"],
+            is_abnormal=True,
+            strength=EvidenceStrength.MODERATE,
+            source="clinical_history"
+        )
+    )
+    for key, config in SYMPTOM_PATTERNS.items()
+)
+
 
 def extract_symptoms(text: str) -> List[Finding]:
     """Extract symptom findings from clinical text."""
+    return _findings_for_keys(_match_symptom_keys(text.lower()))
+
+
+def _findings_for_keys(matched_keys: Set[str]) -> List[Finding]:
     findings = []
-    text_lower = text.lower()
-    matched_keys = set()
-    
-    for key, config in SYMPTOM_PATTERNS.items():
-        if key in matched_keys:
+    for key, name, significance, severity, evidence in _SYMPTOM_ITEMS:
+        if key not in matched_keys:
             continue
-        for pattern in config["patterns"]:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                evidence = Evidence(
-                    type=EvidenceType.SYMPTOM,
-                    description=f"Symptom identified: {config['finding']}",
-                    value=config["finding"],
-                    is_abnormal=True,
-                    strength=EvidenceStrength.MODERATE,
-                    source="clinical_history"
-                )
-                finding = Finding(
-                    name=config["finding"],
-                    present=True,
-                    evidence=[evidence],
-                    clinical_significance=config["significance"],
-                    severity=config["severity"]
-                )
-                findings.append(finding)
-                matched_keys.add(key)
-                break
-    
+        finding = Finding(
+            name=name,
+            present=True,
+            evidence=[evidence],
+            clinical_significance=significance,
+            severity=severity
+        )
+        findings.append(finding)
+
     return findings
 
 
+# Finding name -> disease keys it supports (finding names are unique per entry)
+FINDING_TO_DISEASES: Dict[str, List[str]] = {
+    config["finding"]: config["diseases"] for config in SYMPTOM_PATTERNS.values()
+}
+
+# Map findings to diseases
+_DISEASE_MAP = {
+    "pneumonia": PNEUMONIA,
+    "copd": COPD_EXACERBATION,
+    "asthma": ASTHMA_EXACERBATION,
+    "pulmonary_embolism": PULMONARY_EMBOLISM,
+    "tb": TUBERCULOSIS
+}
+
+# (criterion, lowered criterion) pairs so matching never re-lowers the criteria
+_DISEASE_LOWER_CRITERIA = {
+    key: tuple((c, c.lower()) for c in disease.typical_symptoms)
+    for key, disease in _DISEASE_MAP.items()
+}
+
+# Leading major criteria and differentials per disease; copied into each hypothesis
+_DISEASE_REQUIRED = {key: tuple(disease.major_criteria[:3]) for key, disease in _DISEASE_MAP.items()}
+_DISEASE_DIFFERENTIALS = {key: tuple(disease.differential_diagnoses[:4]) for key, disease in _DISEASE_MAP.items()}
+_DISEASE_URGENCY = {key: Severity(disease.default_urgency) for key, disease in _DISEASE_MAP.items()}
+
+# Integer ranks preserving the existing ordering of Severity values, which
+# compare as strings ("normal" sorts highest, so the running max never moves)
+_SEVERITY_RANK = {severity: rank for rank, severity in enumerate(sorted(Severity, key=lambda s: s.value))}
+_NORMAL_RANK = _SEVERITY_RANK[Severity.NORMAL]
+_HIGH_RANK = _SEVERITY_RANK[Severity.HIGH]
+
+
 def build_pulmonary_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothesis]:
     """Build pulmonary diagnostic hypotheses based on symptoms."""
     disease_scores: Dict[str, Dict] = {}
     
-    # Map findings to diseases
-    disease_key_map = {
-        "pneumonia": PNEUMONIA,
-        "copd": COPD_EXACERBATION,
-        "asthma": ASTHMA_EXACERBATION,
-        "pulmonary_embolism": PULMONARY_EMBOLISM,
-        "tb": TUBERCULOSIS
-    }
-    
     for finding in findings:
-        for key, config in SYMPTOM_PATTERNS.items():
-            if finding.name == config["finding"]:
-                for disease_key in config["diseases"]:
-                    if disease_key not in disease_scores:
-                        disease_scores[disease_key] = {"findings": [], "evidence": [], "severity_max": Severity.NORMAL}
-                    disease_scores[disease_key]["findings"].append(finding.name)
-                    disease_scores[disease_key]["evidence"].extend(finding.evidence)
-                    if finding.severity.value > disease_scores[disease_key]["severity_max"].value:
-                        disease_scores[disease_key]["severity_max"] = finding.severity
+        severity_rank = _SEVERITY_RANK[finding.severity]
+        for disease_key in FINDING_TO_DISEASES.get(finding.name, ()):
+            if disease_key not in disease_scores:
+                disease_scores[disease_key] = {"findings": [], "evidence": [], "severity_max": _NORMAL_RANK}
+            disease_scores[disease_key]["findings"].append(finding.name)
+            disease_scores[disease_key]["evidence"].extend(finding.evidence)
+            if severity_rank > disease_scores[disease_key]["severity_max"]:
+                disease_scores[disease_key]["severity_max"] = severity_rank
     
     hypotheses = []
     for disease_key, score_data in disease_scores.items():
-        if disease_key not in disease_key_map:
+        if disease_key not in _DISEASE_MAP:
             continue
-        disease = disease_key_map[disease_key]
+        disease = _DISEASE_MAP[disease_key]
         
         # Check symptom criteria match
-        criteria_met = []
-        for symptom in disease.typical_symptoms:
-            if any(symptom.lower() in f.lower() for f in score_data["findings"]):
-                criteria_met.append(symptom)
+        found_lower = [f.lower() for f in score_data["findings"]]
+        criteria_met = [c for c, c_lower in _DISEASE_LOWER_CRITERIA[disease_key] if any(c_lower in f for f in found_lower)]
         
         # Symptoms alone provide moderate probability
         finding_count = len(score_data["findings"])
@@ -305,7 +494,7 @@ def build_pulmonary_hypotheses(findings: List[Finding]) -> List[DiagnosticHypoth
         probability = min(0.65, criteria_match * 0.4 + (finding_count * 0.05))
         
         # Boost for high severity findings
-        if score_data["severity_max"] == Severity.HIGH:
+        if score_data["severity_max"] == _HIGH_RANK:
             probability += 0.1
         
         if probability > 0.15:
@@ -314,33 +503,65 @@ def build_pulmonary_hypotheses(findings: List[Finding]) -> List[DiagnosticHypoth
                 icd10_code=disease.icd10_code,
                 probability=round(probability, 3),
                 supporting_evidence=score_data["evidence"],
-                required_for_diagnosis=disease.major_criteria[:3],
+                required_for_diagnosis=list(_DISEASE_REQUIRED[disease_key]),
                 criteria_met=criteria_met,
-                differential_diagnoses=disease.differential_diagnoses[:4],
+                differential_diagnoses=list(_DISEASE_DIFFERENTIALS[disease_key]),
                 recommended_workup=["Chest X-ray", "Complete blood count", "Basic metabolic panel"],
-                urgency=Severity(disease.default_urgency)
+                urgency=_DISEASE_URGENCY[disease_key]
             ))
     
     hypotheses.sort(key=lambda h: h.probability, reverse=True)
     return hypotheses
 
 
+# Report for empty input; _empty_pulmonary_report() gives each caller its own containers
+_EMPTY_PULMONARY_REPORT = {
+    "agent": "pulmonologist",
+    "input_snippet": "",
+    "diagnoses": {},
+    "top_diagnosis": "No symptom data provided",
+    "confidence": 0.0,
+    "explanation": "No clinical history or symptoms provided",
+    "findings": (),
+    "hypotheses": (),
+    "flags": ("INCOMPLETE_DATA",)
+}
+
+
+def _empty_pulmonary_report() -> Dict[str, Any]:
+    return {
+        **_EMPTY_PULMONARY_REPORT,
+        "diagnoses": {},
+        "findings": [],
+        "hypotheses": [],
+        "flags": list(_EMPTY_PULMONARY_REPORT["flags"])
+    }
+
+
 def pulmonologist_agent(symptoms_text: str) -> Dict[str, Any]:
     """Main pulmonologist agent function."""
     if not symptoms_text or not symptoms_text.strip():
-        return {
-            "agent": "pulmonologist",
-            "input_snippet": "",
-            "diagnoses": {},
-            "top_diagnosis": "No symptom data provided",
-            "confidence": 0.0,
-            "explanation": "No clinical history or symptoms provided",
-            "findings": [],
-            "hypotheses": [],
-            "flags": ["INCOMPLETE_DATA"]
-        }
+        return _empty_pulmonary_report()
     
-    findings = extract_symptoms(symptoms_text)
+    return _assemble_pulmonary_report(symptoms_text, extract_symptoms(symptoms_text))
+
+
+def pulmonologist_agent_batch(symptom_texts: List[str]) -> List[Dict[str, Any]]:
+    """Run the pulmonologist over many symptom histories, sharing one pattern scan across them."""
+    reports: List[Optional[Dict[str, Any]]] = [None] * len(symptom_texts)
+    pending = []
+    for i, text in enumerate(symptom_texts):
+        if not text or not text.strip():
+            reports[i] = _empty_pulmonary_report()
+        else:
+            pending.append(i)
+    keys_per_text = _match_symptom_keys_batch([symptom_texts[i].lower() for i in pending])
+    for i, matched_keys in zip(pending, keys_per_text):
+        reports[i] = _assemble_pulmonary_report(symptom_texts[i], _findings_for_keys(matched_keys))
+    return reports
+
+
+def _assemble_pulmonary_report(symptoms_text: str, findings: List[Finding]) -> Dict[str, Any]:
     hypotheses = build_pulmonary_hypotheses(findings)
     
     if hypotheses:
@@ -354,8 +575,15 @@ def pulmonologist_agent(symptoms_text: str) -> Dict[str, Any]:
         primary_impression = "No specific pulmonary abnormality identified"
         explanation = "No concerning respiratory symptoms identified in the provided text"
     
+    # Count high-severity findings and build their flags in one pass
+    high_severity = 0
+    flags = []
+    for finding in findings:
+        if finding.severity == Severity.HIGH:
+            high_severity += 1
+            flags.append(f"ALERT: {finding.name} - {finding.clinical_significance}")
+    
     # Calculate confidence
-    high_severity = sum(1 for f in findings if f.severity == Severity.HIGH)
     confidence = calculate_confidence(
         evidence_count=len(findings),
         strong_evidence_count=high_severity,
@@ -363,12 +591,6 @@ def pulmonologist_agent(symptoms_text: str) -> Dict[str, Any]:
         criteria_met_ratio=len(hypotheses) / 5 if hypotheses else 0.0
     ) if findings else 0.3
     
-    # Build flags
-    flags = []
-    for finding in findings:
-        if finding.severity == Severity.HIGH:
-            flags.append(f"ALERT: {finding.name} - {finding.clinical_significance}")
-    
     return {
         "agent": "pulmonologist",
         "input_snippet": symptoms_text[:200],
@@ -14,10 +14,14 @@ Supported Findings:
 - Pleural abnormalities (effusion, pneumothorax)
 """
 
+import asyncio
 import json
 import re
-from typing import Dict, List, Any, Optional, Tuple
-from openai import OpenAI
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Set, Tuple
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
 import os
 
 from app.core.evidence_layer import (
@@ -28,8 +32,68 @@ from app.core.disease_modules import (
     PNEUMONIA, HEART_FAILURE, COPD_EXACERBATION, PULMONARY_EMBOLISM,
     TUBERCULOSIS
 )
+from app.core.gpt_batcher import run_batch_job
+from app.core.gpt_cache import GPTResponseCache, prompt_key
+from app.core.utils import hyperscan_compatible, required_literals
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+try:
+    import hyperscan  # Optional: multi-pattern DFA scanner
+except ImportError:
+    hyperscan = None
+
+try:
+    import ahocorasick  # Optional: literal-anchor prefilter
+except ImportError:
+    ahocorasick = None
+
+try:
+    import orjson  # Optional: faster JSON parsing
+except ImportError:
+    orjson = None
+
+# Retries are handled by get_gpt_interpretation, not the SDK
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+aclient = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+
+# Rate limits, timeouts, dropped connections and 5xx are worth another try;
+# any other error (bad request, unparseable reply) goes straight to the fallback
+_GPT_RETRYABLE = (RateLimitError, APIConnectionError, InternalServerError)
+_GPT_ATTEMPTS = 3
+
+
+def _gpt_backoff(attempt: int) -> float:
+    """Seconds to wait before retrying after failed attempt number `attempt`."""
+    return 0.5 * 2 ** attempt
+
+
+async def _stream_json_reply(**request: Any) -> str:
+    """
+    Stream a chat completion and stop reading as soon as the reply holds a
+    complete JSON object, rather than waiting for the model to finish.
+    """
+    stream = await aclient.chat.completions.create(stream=True, **request)
+    parts: List[str] = []
+    try:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            parts.append(delta)
+            # Only a closing brace can complete the object; braces inside
+            # string values just fail to parse and reading continues
+            if "}" in delta:
+                try:
+                    if _parse_interpretation("".join(parts)) is not None:
+                        break
+                except ValueError:
+                    pass
+    finally:
+        await stream.close()
+    return "".join(parts)
+
+
+# Parsed interpretations by prompt hash; set GPT_CACHE_PATH to persist them
+_gpt_cache = GPTResponseCache(maxsize=1024, path=os.environ.get("GPT_CACHE_PATH"))
 
 # ============================================================================
 # DEFINITIVE DIAGNOSTIC FINDINGS - Gold standard evidence that confirms diagnosis
@@ -83,6 +147,17 @@ DEFINITIVE_FINDINGS = {
     }
 }
 
+# Flat (condition, compiled pattern, diagnosis, confidence, explanation, icd10)
+# records, one per pattern in DEFINITIVE_FINDINGS order, so the first record
+# that matches is the finding to report. Compiled once at import so the
+# per-request path never touches the re cache.
+_DEFINITIVE_RECORDS: Tuple[Tuple[str, re.Pattern, str, float, str, str], ...] = tuple(
+    (condition, re.compile(p, re.IGNORECASE), config["diagnosis"], config["confidence"],
+     config["explanation"], config["icd10"])
+    for condition, config in DEFINITIVE_FINDINGS.items()
+    for p in config["patterns"]
+)
+
 # ============================================================================
 # RADIOLOGICAL PATTERN RECOGNITION
 # ============================================================================
@@ -196,6 +271,161 @@ IMAGING_PATTERNS = {
     }
 }
 
+# Every imaging pattern in IMAGING_PATTERNS order, addressed by its position
+_IMAGING_ALTERNATIVES = tuple(
+    (key, pattern, re.compile(pattern, re.IGNORECASE))
+    for key, config in IMAGING_PATTERNS.items()
+    for pattern in config["patterns"]
+)
+
+
+def _imaging_evidence(key: str, pattern: str) -> Evidence:
+    config = IMAGING_PATTERNS[key]
+    return Evidence(
+        type=EvidenceType.IMAGING,
+        description=f"Pattern matched: {pattern}",
+        value=config["finding"],
+        is_abnormal=config["severity"] != Severity.NORMAL,
+        strength=EvidenceStrength.STRONG if config["severity"] in [Severity.HIGH, Severity.CRITICAL] else EvidenceStrength.MODERATE,
+        source="radiology_report"
+    )
+
+
+# Evidence per imaging pattern, by position. Evidence is frozen, so each template
+# instance is shared by every finding matched through that pattern.
+_IMAGING_EVIDENCE = tuple(_imaging_evidence(key, pattern) for key, pattern, _ in _IMAGING_ALTERNATIVES)
+
+
+def _index_imaging_patterns():
+    """
+    Index every imaging pattern under the literals it cannot match without, so
+    one pass over the report picks out the few patterns worth searching for.
+    """
+    positions_by_anchor: Dict[str, List[int]] = {}
+    ungated: List[int] = []
+    for i, (_, pattern, _) in enumerate(_IMAGING_ALTERNATIVES):
+        anchors = required_literals(pattern)
+        if anchors is None:
+            ungated.append(i)
+            continue
+        for anchor in anchors:
+            positions_by_anchor.setdefault(anchor, []).append(i)
+    return positions_by_anchor, ungated
+
+
+_IMAGING_POSITIONS_BY_ANCHOR, _IMAGING_UNGATED = _index_imaging_patterns()
+
+
+def _build_imaging_automaton():
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for anchor in _IMAGING_POSITIONS_BY_ANCHOR:
+        automaton.add_word(anchor, anchor)
+    automaton.make_automaton()
+    return automaton
+
+
+_IMAGING_AUTOMATON = _build_imaging_automaton()
+
+
+def _build_hyperscan_db(patterns: List[str], flags: int):
+    """Compile patterns (ids are their positions) into one Hyperscan database, if available."""
+    if hyperscan is None:
+        return None
+    db = hyperscan.Database()
+    try:
+        db.compile(
+            expressions=[p.encode() for p in patterns],
+            ids=list(range(len(patterns))),
+            elements=len(patterns),
+            flags=hyperscan.HS_FLAG_CASELESS | flags
+        )
+    except hyperscan.error:
+        return None
+    return db
+
+
+# Match start offsets are needed for the negation window, hence SOM_LEFTMOST
+_IMAGING_HS_DB = _build_hyperscan_db(
+    [pattern for _, pattern, _ in _IMAGING_ALTERNATIVES], hyperscan and hyperscan.HS_FLAG_SOM_LEFTMOST
+)
+# Pattern ids are indexes into _DEFINITIVE_RECORDS
+_DEFINITIVE_HS_DB = _build_hyperscan_db(
+    [record[1].pattern for record in _DEFINITIVE_RECORDS], hyperscan and hyperscan.HS_FLAG_SINGLEMATCH
+)
+_hs_local = threading.local()  # Hyperscan scratch space is not thread-safe
+
+
+def _hs_scratch(name: str, db):
+    scratch = getattr(_hs_local, name, None)
+    if scratch is None:
+        scratch = hyperscan.Scratch(db)
+        setattr(_hs_local, name, scratch)
+    return scratch
+
+
+def _on_definitive_match(pattern_id: int, start: int, end: int, flags: int, hits: Set[int]) -> None:
+    hits.add(pattern_id)
+
+
+def _on_imaging_match(pattern_id: int, start: int, end: int, flags: int, first_starts: Dict[int, int]) -> None:
+    # Matches arrive by end offset, so a later one can still start earlier
+    if first_starts.get(pattern_id, start + 1) > start:
+        first_starts[pattern_id] = start
+
+
+def _imaging_first_starts(text_lower: str) -> Optional[Dict[int, int]]:
+    """
+    Offset of the first match of each imaging pattern (by position in
+    _IMAGING_ALTERNATIVES), or None when Hyperscan can't scan this text.
+    """
+    if _IMAGING_HS_DB is None or not hyperscan_compatible(text_lower):
+        return None
+    first_starts: Dict[int, int] = {}
+    _IMAGING_HS_DB.scan(
+        text_lower.encode(), match_event_handler=_on_imaging_match, context=first_starts,
+        scratch=_hs_scratch("imaging_scratch", _IMAGING_HS_DB)
+    )
+    return first_starts
+
+
+def _candidate_imaging_patterns(text_lower: str) -> Optional[Set[int]]:
+    """
+    Positions of the imaging patterns whose anchors occur in the text, or None
+    when every pattern has to run. The anchors are only a sound gate on ASCII
+    text: under re.IGNORECASE e.g. "s" also matches the long s "\u017f".
+    """
+    if not text_lower.isascii():
+        return None
+    if _IMAGING_AUTOMATON is not None:
+        present = {anchor for _, anchor in _IMAGING_AUTOMATON.iter(text_lower)}
+    else:
+        present = [anchor for anchor in _IMAGING_POSITIONS_BY_ANCHOR if anchor in text_lower]
+    candidates = set(_IMAGING_UNGATED)
+    for anchor in present:
+        candidates.update(_IMAGING_POSITIONS_BY_ANCHOR[anchor])
+    return candidates
+
+
+def _definitive_hints() -> Optional[Tuple[str, ...]]:
+    """
+    Literals at least one of which every definitive match contains, or None if
+    some pattern has no such literal. Only a sound prescreen on ASCII text,
+    since re.IGNORECASE lets some letters match non-ASCII characters.
+    """
+    hints = set()
+    for config in DEFINITIVE_FINDINGS.values():
+        for pattern in config["patterns"]:
+            literals = required_literals(pattern)
+            if literals is None:
+                return None
+            hints.update(literals)
+    return tuple(sorted(hints))
+
+
+_DEFINITIVE_HINTS = _definitive_hints()
+
 
 def check_definitive_findings(text: str) -> Optional[Dict[str, Any]]:
     """
@@ -203,68 +433,130 @@ def check_definitive_findings(text: str) -> Optional[Dict[str, Any]]:
     When these are found, the diagnosis is CONFIRMED (not suspected).
     Returns the definitive finding info if found, None otherwise.
     """
-    text_lower = text.lower()
+    return _check_definitive_lowered(text.lower())
+
+
+def _check_definitive_lowered(text_lower: str) -> Optional[Dict[str, Any]]:
+    # Most reports (e.g. normal studies) contain none of the definitive literals
+    if (
+        _DEFINITIVE_HINTS is not None and text_lower.isascii()
+        and not any(hint in text_lower for hint in _DEFINITIVE_HINTS)
+    ):
+        return None
     
-    for condition, config in DEFINITIVE_FINDINGS.items():
-        for pattern in config["patterns"]:
-            if re.search(pattern, text_lower, re.IGNORECASE):
-                return {
-                    "condition": condition,
-                    "diagnosis": config["diagnosis"],
-                    "confidence": config["confidence"],
-                    "explanation": config["explanation"],
-                    "icd10": config["icd10"],
-                    "is_definitive": True
-                }
-    return None
+    if _DEFINITIVE_HS_DB is not None and hyperscan_compatible(text_lower):
+        hits: Set[int] = set()
+        _DEFINITIVE_HS_DB.scan(
+            text_lower.encode(), match_event_handler=_on_definitive_match, context=hits,
+            scratch=_hs_scratch("definitive_scratch", _DEFINITIVE_HS_DB)
+        )
+        if not hits:
+            return None
+        record = _DEFINITIVE_RECORDS[min(hits)]
+    else:
+        for record in _DEFINITIVE_RECORDS:
+            if record[1].search(text_lower):
+                break
+        else:
+            return None
+    
+    condition, _, diagnosis, confidence, explanation, icd10 = record
+    return {
+        "condition": condition,
+        "diagnosis": diagnosis,
+        "confidence": confidence,
+        "explanation": explanation,
+        "icd10": icd10,
+        "is_definitive": True
+    }
 
 
-def _is_negated(text: str, match_start: int) -> bool:
+_NEG_RE = re.compile(
+    r"\b(?:no|not|without|absent|negative|rules?\s*out|denies?|excludes?|no\s*evidence|unremarkable|normal)\b"
+)
+
+
+def _is_negated(text_lower: str, match_start: int) -> bool:
     """Check if a finding is negated (e.g., 'no pulmonary edema')."""
-    # Look at the 30 characters before the match
-    prefix = text[max(0, match_start - 30):match_start].lower()
-    negation_patterns = [
-        r"\bno\b", r"\bnot\b", r"\bwithout\b", r"\babsent\b", r"\bnegative\b",
-        r"\brules?\s*out\b", r"\bdenies?\b", r"\bexcludes?\b", r"\bno\s*evidence\b",
-        r"\bunremarkable\b", r"\bnormal\b"
-    ]
-    for neg in negation_patterns:
-        if re.search(neg, prefix):
-            return True
-    return False
+    # Look at the 30 characters before the match. Slicing rather than passing
+    # pos/endpos keeps \b treating the window edge as a word boundary.
+    return _NEG_RE.search(text_lower[max(0, match_start - 30):match_start]) is not None
 
 
 def extract_findings(text: str) -> List[Finding]:
     """Extract radiological findings from text using pattern matching with negation detection."""
+    return _extract_findings_with_offsets(text)[0]
+
+
+def _extract_findings_with_offsets(
+    text: str,
+    text_lower: Optional[str] = None
+) -> Tuple[List[Finding], List[int]]:
+    """
+    extract_findings, plus the report offset each finding was matched at.
+    Callers that already lowered the text pass it in to skip a second copy.
+    """
     findings = []
-    text_lower = text.lower()
+    match_starts = []
+    if text_lower is None:
+        text_lower = text.lower()
+    first_starts = _imaging_first_starts(text_lower)
+    candidates = _candidate_imaging_patterns(text_lower) if first_starts is None else None
+    matched_keys = set()
     
-    for key, config in IMAGING_PATTERNS.items():
-        for pattern in config["patterns"]:
-            match = re.search(pattern, text_lower, re.IGNORECASE)
-            if match:
-                # Check if this finding is negated
-                if _is_negated(text_lower, match.start()):
-                    continue  # Skip negated findings
-                    
-                evidence = Evidence(
-                    type=EvidenceType.IMAGING,
-                    description=f"Pattern matched: {pattern}",
-                    value=config["finding"],
-                    is_abnormal=config["severity"] != Severity.NORMAL,
-                    strength=EvidenceStrength.STRONG if config["severity"] in [Severity.HIGH, Severity.CRITICAL] else EvidenceStrength.MODERATE,
-                    source="radiology_report"
-                )
-                finding = Finding(
-                    name=config["finding"],
-                    present=True,
-                    evidence=[evidence],
-                    clinical_significance=config["significance"],
-                    severity=config["severity"]
-                )
-                findings.append(finding)
-                break
-    return findings
+    for i, (key, _, pat) in enumerate(_IMAGING_ALTERNATIVES):
+        if key in matched_keys:
+            continue
+        if first_starts is not None:
+            start = first_starts.get(i)
+        elif candidates is None or i in candidates:
+            match = pat.search(text_lower)
+            start = match.start() if match else None
+        else:
+            start = None
+        if start is None:
+            continue
+        # Check if this finding is negated
+        if _is_negated(text_lower, start):
+            continue  # Skip negated findings
+        matched_keys.add(key)
+        
+        config = IMAGING_PATTERNS[key]
+        finding = Finding(
+            name=config["finding"],
+            present=True,
+            evidence=[_IMAGING_EVIDENCE[i]],
+            clinical_significance=config["significance"],
+            severity=config["severity"]
+        )
+        findings.append(finding)
+        match_starts.append(start)
+    
+    if len(text_lower) != len(text):
+        match_starts = []  # Lowering changed the length, so offsets don't map back
+    return findings, match_starts
+
+
+# Finding name -> (disease keys it supports, whether it is definitive); finding
+# names are unique per entry
+FINDING_TO_DISEASES: Dict[str, Tuple[List[str], bool]] = {
+    config["finding"]: (config["diseases"], config.get("is_definitive", False))
+    for config in IMAGING_PATTERNS.values()
+}
+
+_DISEASE_MAP = {
+    "pneumonia": PNEUMONIA,
+    "heart_failure": HEART_FAILURE,
+    "copd_exacerbation": COPD_EXACERBATION,
+    "pulmonary_embolism": PULMONARY_EMBOLISM,
+    "tuberculosis": TUBERCULOSIS
+}
+
+# (criterion, lowered criterion) pairs so matching never re-lowers the criteria
+_DISEASE_LOWER_CRITERIA = {
+    key: tuple((c, c.lower()) for c in disease.imaging_findings)
+    for key, disease in _DISEASE_MAP.items()
+}
 
 
 def build_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothesis]:
@@ -272,33 +564,27 @@ def build_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothesis]:
     disease_scores: Dict[str, Dict] = {}
     
     for finding in findings:
-        for key, config in IMAGING_PATTERNS.items():
-            if finding.name == config["finding"]:
-                for disease_key in config["diseases"]:
-                    if disease_key not in disease_scores:
-                        disease_scores[disease_key] = {"findings": [], "critical": False, "definitive": False, "evidence": []}
-                    disease_scores[disease_key]["findings"].append(finding.name)
-                    disease_scores[disease_key]["evidence"].extend(finding.evidence)
-                    if finding.severity == Severity.CRITICAL:
-                        disease_scores[disease_key]["critical"] = True
-                    # Check if this is a DEFINITIVE diagnostic finding
-                    if config.get("is_definitive"):
-                        disease_scores[disease_key]["definitive"] = True
-    
-    disease_map = {
-        "pneumonia": PNEUMONIA,
-        "heart_failure": HEART_FAILURE,
-        "copd_exacerbation": COPD_EXACERBATION,
-        "pulmonary_embolism": PULMONARY_EMBOLISM,
-        "tuberculosis": TUBERCULOSIS
-    }
+        disease_keys, is_definitive = FINDING_TO_DISEASES.get(finding.name, ((), False))
+        # Lowered once here, however many diseases the finding supports
+        name_lower = finding.name.lower() if disease_keys else None
+        for disease_key in disease_keys:
+            if disease_key not in disease_scores:
+                disease_scores[disease_key] = {"findings_lower": [], "critical": False, "definitive": False, "evidence": []}
+            disease_scores[disease_key]["findings_lower"].append(name_lower)
+            disease_scores[disease_key]["evidence"].extend(finding.evidence)
+            if finding.severity == Severity.CRITICAL:
+                disease_scores[disease_key]["critical"] = True
+            # Check if this is a DEFINITIVE diagnostic finding
+            if is_definitive:
+                disease_scores[disease_key]["definitive"] = True
     
     hypotheses = []
     for disease_key, score_data in disease_scores.items():
-        if disease_key not in disease_map:
+        if disease_key not in _DISEASE_MAP:
             continue
-        disease = disease_map[disease_key]
-        criteria_met = [c for c in disease.imaging_findings if any(c.lower() in f.lower() for f in score_data["findings"])]
+        disease = _DISEASE_MAP[disease_key]
+        found_lower = score_data["findings_lower"]
+        criteria_met = [c for c, c_lower in _DISEASE_LOWER_CRITERIA[disease_key] if any(c_lower in f for f in found_lower)]
         match_ratio = len(criteria_met) / max(len(disease.imaging_findings), 1)
         
         # CRITICAL FIX: Definitive findings = confirmed diagnosis (0.95+)
@@ -326,11 +612,32 @@ def build_hypotheses(findings: List[Finding]) -> List[DiagnosticHypothesis]:
     return hypotheses
 
 
-def get_gpt_interpretation(text: str, findings: List[Finding]) -> Dict[str, Any]:
-    """Get GPT interpretation for complex cases."""
+# Longer reports are cut down to the sentences the findings came from
+_MAX_PROMPT_REPORT_CHARS = 500
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _relevant_report_text(text: str, match_starts: Optional[List[int]]) -> str:
+    """The report text to send to GPT: unchanged if short, else its matched sentences."""
+    if len(text) <= _MAX_PROMPT_REPORT_CHARS:
+        return text
+    sentences = []
+    sentence_start = 0
+    for brk in _SENTENCE_BREAK_RE.finditer(text):
+        sentences.append((sentence_start, brk.start()))
+        sentence_start = brk.end()
+    sentences.append((sentence_start, len(text)))
+    starts = match_starts or ()
+    relevant = " ".join(text[a:b] for a, b in sentences if any(a <= s < b for s in starts))
+    # Without matched sentences, fall back to the head of the report
+    return (relevant or text)[:_MAX_PROMPT_REPORT_CHARS] + " [truncated]"
+
+
+def _build_radiology_prompt(text: str, findings: List[Finding], match_starts: Optional[List[int]] = None) -> str:
+    text = _relevant_report_text(text, match_starts)
     findings_summary = "\n".join([f"- {f.name}: {f.clinical_significance}" for f in findings])
     
-    prompt = f"""You are a radiologist interpreting chest imaging.
+    return f"""You are a radiologist interpreting chest imaging.
 
 Report: "{text}"
 
@@ -347,24 +654,222 @@ Provide interpretation in JSON format:
 
 Return ONLY valid JSON."""
 
-    try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            timeout=15
-        )
-        raw = response.choices[0].message.content
-        start, end = raw.find("{"), raw.rfind("}") + 1
-        if start != -1 and end > start:
-            return json.loads(raw[start:end])
-    except:
-        pass
-    
+
+def _parse_interpretation(raw: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The JSON object in a GPT reply; raises ValueError if it is malformed."""
+    if not raw:
+        return None
+    start, end = raw.find("{"), raw.rfind("}") + 1
+    if start == -1 or end <= start:
+        return None
+    if orjson is not None:
+        try:
+            return orjson.loads(raw[start:end])
+        except orjson.JSONDecodeError:
+            pass  # json tolerates raw control characters inside strings
+    return json.loads(raw[start:end], strict=False)
+
+
+def _fallback_interpretation() -> Dict[str, Any]:
     return {"impression": "Unable to generate interpretation", "primary_diagnosis": "Requires review", "confidence": 0.3, "recommendations": []}
 
 
+def get_gpt_interpretation(
+    text: str, findings: List[Finding], match_starts: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """
+    Get GPT interpretation for complex cases. With match_starts (offsets of
+    the findings in text), long reports are cut down to the matched sentences.
+    """
+    prompt = _build_radiology_prompt(text, findings, match_starts)
+    key = prompt_key(prompt)
+    cached = _gpt_cache.get(key)
+    if cached is not None:
+        return cached
+    for attempt in range(_GPT_ATTEMPTS):
+        try:
+            response = client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                timeout=15
+            )
+            parsed = _parse_interpretation(response.choices[0].message.content)
+            if parsed is not None:
+                _gpt_cache.put(key, parsed)
+                return parsed
+            break
+        except _GPT_RETRYABLE:
+            if attempt + 1 < _GPT_ATTEMPTS:
+                time.sleep(_gpt_backoff(attempt))
+        except Exception:
+            break
+    
+    return _fallback_interpretation()
+
+
+async def get_gpt_interpretation_async(
+    text: str, findings: List[Finding], match_starts: Optional[List[int]] = None
+) -> Dict[str, Any]:
+    """Async variant of get_gpt_interpretation that streams the reply."""
+    prompt = _build_radiology_prompt(text, findings, match_starts)
+    key = prompt_key(prompt)
+    cached = _gpt_cache.get(key)
+    if cached is not None:
+        return cached
+    for attempt in range(_GPT_ATTEMPTS):
+        try:
+            raw = await _stream_json_reply(
+                model="gpt-4o-mini",
+                messages=[{"role": "user", "content": prompt}],
+                timeout=15
+            )
+            parsed = _parse_interpretation(raw)
+            if parsed is not None:
+                _gpt_cache.put(key, parsed)
+                return parsed
+            break
+        except _GPT_RETRYABLE:
+            if attempt + 1 < _GPT_ATTEMPTS:
+                await asyncio.sleep(_gpt_backoff(attempt))
+        except Exception:
+            break
+    
+    return _fallback_interpretation()
+
+
+# Above this top-hypothesis probability the pattern layer is confident enough
+# that the GPT round-trip is skipped
+_GPT_SKIP_PROBABILITY = 0.8
+
+
+def _pattern_interpretation(hypotheses: List[DiagnosticHypothesis]) -> Optional[Dict[str, Any]]:
+    """Stand-in for the GPT interpretation when the pattern layer is already confident, else None."""
+    if not hypotheses:
+        return None
+    top = hypotheses[0]
+    if top.probability < _GPT_SKIP_PROBABILITY and not any(h.urgency == Severity.CRITICAL for h in hypotheses):
+        return None
+    return {
+        "impression": f"{top.diagnosis} (probability: {top.probability:.0%})",
+        "primary_diagnosis": top.diagnosis,
+        "confidence": top.probability,
+        "recommendations": []
+    }
+
+
 def radiologist_agent(radiology_text: str) -> Dict[str, Any]:
     """Main radiologist agent function."""
+    text_lower = radiology_text.lower()
+    report = _local_radiology_report(radiology_text, text_lower)
+    if report is not None:
+        return report
+    
+    # STEP 2: Standard pattern matching for non-definitive cases
+    findings, match_starts = _extract_findings_with_offsets(radiology_text, text_lower)
+    hypotheses = build_hypotheses(findings)
+    gpt_result = _pattern_interpretation(hypotheses) or get_gpt_interpretation(radiology_text, findings, match_starts)
+    return _assemble_radiology_report(radiology_text, findings, hypotheses, gpt_result)
+
+
+async def radiologist_agent_async(radiology_text: str) -> Dict[str, Any]:
+    """Async radiologist agent; the GPT request does not block the event loop."""
+    text_lower = radiology_text.lower()
+    report = _local_radiology_report(radiology_text, text_lower)
+    if report is not None:
+        return report
+    
+    findings, match_starts = _extract_findings_with_offsets(radiology_text, text_lower)
+    hypotheses = build_hypotheses(findings)
+    gpt_result = _pattern_interpretation(hypotheses) or await get_gpt_interpretation_async(
+        radiology_text, findings, match_starts
+    )
+    return _assemble_radiology_report(radiology_text, findings, hypotheses, gpt_result)
+
+
+def radiologist_agent_batch(
+    radiology_texts: List[str], workers: Optional[int] = None, use_batch_api: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Interpret a corpus of radiology reports. Pattern matching fans out over a
+    process pool (workers inherit the compiled patterns on fork), then the
+    reports that still need GPT go out concurrently. With use_batch_api they
+    go through the OpenAI Batch API instead, which is cheaper but can take
+    hours. Runs its own event loop, so call it from synchronous code.
+    """
+    if len(radiology_texts) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            passes = list(pool.map(_radiology_pattern_pass, radiology_texts, chunksize=16))
+    else:
+        passes = [_radiology_pattern_pass(text) for text in radiology_texts]
+    
+    reports = [report for report, _ in passes]
+    pending = [i for i, report in enumerate(reports) if report is None]
+    if pending:
+        items = [(radiology_texts[i], passes[i][1]) for i in pending]
+        if use_batch_api:
+            gpt_results = _batch_api_interpretations(items)
+        else:
+            gpt_results = asyncio.run(_gather_interpretations(items))
+        for i, gpt_result in zip(pending, gpt_results):
+            findings, _, hypotheses = passes[i][1]
+            reports[i] = _assemble_radiology_report(radiology_texts[i], findings, hypotheses, gpt_result)
+    return reports
+
+
+def _radiology_pattern_pass(radiology_text: str):
+    """
+    Everything before the GPT step. Returns (report, None) when no GPT call is
+    needed, else (None, (findings, match_starts, hypotheses)).
+    """
+    text_lower = radiology_text.lower()
+    report = _local_radiology_report(radiology_text, text_lower)
+    if report is not None:
+        return report, None
+    
+    findings, match_starts = _extract_findings_with_offsets(radiology_text, text_lower)
+    hypotheses = build_hypotheses(findings)
+    gpt_result = _pattern_interpretation(hypotheses)
+    if gpt_result is not None:
+        return _assemble_radiology_report(radiology_text, findings, hypotheses, gpt_result), None
+    return None, (findings, match_starts, hypotheses)
+
+
+async def _gather_interpretations(items: List[Tuple[str, Tuple]]) -> List[Dict[str, Any]]:
+    return await asyncio.gather(*(
+        get_gpt_interpretation_async(text, findings, match_starts)
+        for text, (findings, match_starts, _) in items
+    ))
+
+
+def _batch_api_interpretations(items: List[Tuple[str, Tuple]]) -> List[Dict[str, Any]]:
+    """Interpretations through the OpenAI Batch API; cached ones are not resubmitted."""
+    prompts = [
+        _build_radiology_prompt(text, findings, match_starts)
+        for text, (findings, match_starts, _) in items
+    ]
+    results = [_gpt_cache.get(prompt_key(prompt)) for prompt in prompts]
+    missing = [i for i, result in enumerate(results) if result is None]
+    try:
+        replies = run_batch_job(client, [
+            {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": prompts[i]}]}
+            for i in missing
+        ])
+    except Exception:
+        replies = [None] * len(missing)
+    
+    for i, raw in zip(missing, replies):
+        try:
+            parsed = _parse_interpretation(raw)
+        except ValueError:
+            parsed = None
+        if parsed is not None:
+            _gpt_cache.put(prompt_key(prompts[i]), parsed)
+        results[i] = parsed if parsed is not None else _fallback_interpretation()
+    return results
+
+
+def _local_radiology_report(radiology_text: str, text_lower: str) -> Optional[Dict[str, Any]]:
+    """Return the report for empty input or a definitive finding, else None."""
     if not radiology_text or not radiology_text.strip():
         return {
             "agent": "radiologist",
@@ -381,7 +886,7 @@ def radiologist_agent(radiology_text: str) -> Dict[str, Any]:
     
     # STEP 1: Check for DEFINITIVE diagnostic findings first
     # These are gold-standard findings that CONFIRM a diagnosis
-    definitive = check_definitive_findings(radiology_text)
+    definitive = _check_definitive_lowered(text_lower)
     
     if definitive:
         # When definitive finding found, diagnosis is CONFIRMED
@@ -408,11 +913,15 @@ def radiologist_agent(radiology_text: str) -> Dict[str, Any]:
             "diagnostic_certainty": "confirmed"
         }
     
-    # STEP 2: Standard pattern matching for non-definitive cases
-    findings = extract_findings(radiology_text)
-    hypotheses = build_hypotheses(findings)
-    gpt_result = get_gpt_interpretation(radiology_text, findings)
-    
+    return None
+
+
+def _assemble_radiology_report(
+    radiology_text: str,
+    findings: List[Finding],
+    hypotheses: List[DiagnosticHypothesis],
+    gpt_result: Dict[str, Any]
+) -> Dict[str, Any]:
     if hypotheses:
         top = hypotheses[0]
         primary_impression = f"{top.diagnosis} (probability: {top.probability:.0%})"
@@ -15,10 +15,21 @@ All outputs should be reviewed by qualified healthcare professionals.
 
 import json
 from typing import Dict, List, Any, Optional
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import os
 
+from app.core.gpt_cache import GPTResponseCache, prompt_key
+
+try:
+    import ahocorasick  # Optional: single-pass keyword scanner
+except ImportError:
+    ahocorasick = None
+
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+aclient = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+# Parsed assessments by prompt hash; set GPT_CACHE_PATH to persist them
+_gpt_cache = GPTResponseCache(maxsize=5000, path=os.environ.get("GPT_CACHE_PATH"))
 
 # ============================================================================
 # CRITICAL CONDITIONS THAT MUST NOT BE MISSED
@@ -67,6 +78,44 @@ CRITICAL_CONDITIONS = {
     }
 }
 
+def _build_critical_automaton():
+    """One automaton over every critical keyword, so the text is scanned once."""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for config in CRITICAL_CONDITIONS.values():
+        for keyword in config["keywords"]:
+            automaton.add_word(keyword.lower(), keyword.lower())
+    automaton.make_automaton()
+    return automaton
+
+
+_CRITICAL_AUTOMATON = _build_critical_automaton()
+
+
+def _collect_strings(obj: Any, out: List[str]) -> None:
+    """Append every string in a nested structure of dicts and lists, dict keys included."""
+    if isinstance(obj, str):
+        out.append(obj)
+    elif isinstance(obj, dict):
+        for key, value in obj.items():
+            if isinstance(key, str):
+                out.append(key)
+            _collect_strings(value, out)
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            _collect_strings(item, out)
+
+
+def _present_critical_keywords(text_lower: str):
+    """The lowered critical keywords that occur in text_lower."""
+    if _CRITICAL_AUTOMATON is not None:
+        return {keyword for _, keyword in _CRITICAL_AUTOMATON.iter(text_lower)}
+    return {
+        keyword.lower() for config in CRITICAL_CONDITIONS.values()
+        for keyword in config["keywords"] if keyword.lower() in text_lower
+    }
+
 # ============================================================================
 # DANGEROUS DRUG-DIAGNOSIS INTERACTIONS
 # ============================================================================
@@ -85,12 +134,16 @@ def check_for_critical_conditions(outputs: List[Dict]) -> List[Dict]:
     """Check if any critical conditions are present in agent outputs."""
     alerts = []
     
-    # Convert all outputs to searchable text
-    combined_text = json.dumps(outputs).lower()
+    # Searchable text: the strings in the outputs, one per line. No keyword
+    # contains a newline, so matches cannot straddle two strings.
+    strings: List[str] = []
+    _collect_strings(outputs, strings)
+    combined_text = "\n".join(strings).lower()
+    present = _present_critical_keywords(combined_text)
     
     for condition, config in CRITICAL_CONDITIONS.items():
         for keyword in config["keywords"]:
-            if keyword.lower() in combined_text:
+            if keyword.lower() in present:
                 alerts.append({
                     "condition": condition,
                     "matched_keyword": keyword,
@@ -113,29 +166,33 @@ def check_for_contradictions(outputs: List[Dict]) -> List[Dict]:
         diagnoses = output.get("diagnoses", {})
         diagnoses_by_agent[agent] = diagnoses
     
-    # Check for conflicting high-probability diagnoses
-    all_diagnoses = {}
+    # Check for conflicting high-probability diagnoses. One pass keeps each
+    # diagnosis's running [min, max, {agent: prob}], so nothing is re-scanned.
+    stats: Dict[str, list] = {}
     for agent, diagnoses in diagnoses_by_agent.items():
         for diagnosis, prob in diagnoses.items():
             try:
                 prob_val = float(prob)
-            except:
+            except (TypeError, ValueError, OverflowError):
                 prob_val = 1.0 if str(prob).lower() in ["true", "yes"] else 0.0
             
             if prob_val > 0.3:  # Only consider significant probabilities
-                if diagnosis not in all_diagnoses:
-                    all_diagnoses[diagnosis] = []
-                all_diagnoses[diagnosis].append((agent, prob_val))
+                entry = stats.get(diagnosis)
+                if entry is None:
+                    stats[diagnosis] = [prob_val, prob_val, {agent: prob_val}]
+                else:
+                    if prob_val < entry[0]:
+                        entry[0] = prob_val
+                    elif prob_val > entry[1]:
+                        entry[1] = prob_val
+                    entry[2][agent] = prob_val
     
-    # Find diagnoses where agents significantly disagree
-    for diagnosis, agent_probs in all_diagnoses.items():
-        if len(agent_probs) < 2:
-            continue
-        probs = [p for _, p in agent_probs]
-        if max(probs) - min(probs) > 0.4:  # Significant disagreement
+    # Find diagnoses where agents significantly disagree; a lone agent has no spread
+    for diagnosis, (low, high, disagreement) in stats.items():
+        if high - low > 0.4:  # Significant disagreement
             contradictions.append({
                 "diagnosis": diagnosis,
-                "disagreement": {agent: prob for agent, prob in agent_probs},
+                "disagreement": disagreement,
                 "severity": "moderate",
                 "recommendation": "Requires additional clinical correlation"
             })
@@ -169,13 +226,21 @@ def check_confidence_calibration(outputs: List[Dict]) -> Dict:
     }
 
 
+def _has_incomplete_flag(flags) -> bool:
+    # A plain loop, and no str() for flags that are already strings: the
+    # generator any() was the bulk of the cost for these short lists
+    for flag in flags:
+        if "INCOMPLETE" in (flag if type(flag) is str else str(flag)).upper():
+            return True
+    return False
+
+
 def check_missing_data(outputs: List[Dict]) -> List[str]:
     """Check if any agents flagged missing data."""
     missing = []
     
     for output in outputs:
-        flags = output.get("flags", [])
-        if any("INCOMPLETE" in str(f).upper() for f in flags):
+        if _has_incomplete_flag(output.get("flags", [])):
             missing.append(output.get("agent", "unknown"))
     
     return missing
@@ -224,52 +289,103 @@ def determine_human_review_needed(
     }
 
 
-def get_gpt_safety_assessment(outputs: List[Dict], preliminary_checks: Dict) -> Dict:
-    """Get GPT assessment for additional safety validation."""
-    formatted_outputs = json.dumps(outputs, indent=2)
-    formatted_checks = json.dumps(preliminary_checks, indent=2)
-    
-    prompt = f"""You are a SAFETY VALIDATION AGENT for a medical diagnostic system.
+# Instructions and reply schema go first, in a system message that never
+# changes, so OpenAI's automatic prompt caching can reuse the prefix
+_SAFETY_SYSTEM_PROMPT = """You are a SAFETY VALIDATION AGENT for a medical diagnostic system.
 
 Your job is to identify potential errors, hallucinations, or dangerous recommendations.
 
-Agent Outputs:
-{formatted_outputs}
-
-Preliminary Safety Checks:
-{formatted_checks}
-
-Evaluate and respond in JSON format:
-{{
+Evaluate the agent outputs and preliminary safety checks you are given and respond in JSON format:
+{
     "hallucination_risk": "low" | "moderate" | "high",
     "hallucination_concerns": ["list specific concerns if any"],
     "medically_sound": true | false,
     "concerns": ["list of medical concerns"],
     "missing_considerations": ["important factors not addressed"],
     "final_recommendation": "summary recommendation"
-}}
+}
 
 Return ONLY valid JSON."""
 
+
+def _build_safety_prompt(outputs: List[Dict], preliminary_checks: Dict) -> str:
+    formatted_outputs = json.dumps(outputs, indent=2)
+    formatted_checks = json.dumps(preliminary_checks, indent=2)
+    
+    return f"""Agent Outputs:
+{formatted_outputs}
+
+Preliminary Safety Checks:
+{formatted_checks}"""
+
+
+def _safety_messages(prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": _SAFETY_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def _parse_safety_reply(raw: str) -> Optional[Dict]:
+    start, end = raw.find("{"), raw.rfind("}") + 1
+    if start != -1 and end > start:
+        return json.loads(raw[start:end])
+    return None
+
+
+def _fallback_safety_assessment() -> Dict:
+    return {
+        "hallucination_risk": "unknown",
+        "medically_sound": False,
+        "concerns": ["Unable to complete GPT safety assessment"],
+        "final_recommendation": "Manual review required due to safety check failure"
+    }
+
+
+def get_gpt_safety_assessment(outputs: List[Dict], preliminary_checks: Dict) -> Dict:
+    """Get GPT assessment for additional safety validation."""
+    prompt = _build_safety_prompt(outputs, preliminary_checks)
+    key = prompt_key(prompt)
+    cached = _gpt_cache.get(key)
+    if cached is not None:
+        return cached
     try:
         response = client.chat.completions.create(
             model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
+            messages=_safety_messages(prompt),
             timeout=20
         )
-        raw = response.choices[0].message.content
-        start, end = raw.find("{"), raw.rfind("}") + 1
-        if start != -1 and end > start:
-            return json.loads(raw[start:end])
+        parsed = _parse_safety_reply(response.choices[0].message.content)
+        if parsed is not None:
+            _gpt_cache.put(key, parsed)
+            return parsed
     except:
         pass
     
-    return {
-        "hallucination_risk": "unknown",
-        "medically_sound": False,
-        "concerns": ["Unable to complete GPT safety assessment"],
-        "final_recommendation": "Manual review required due to safety check failure"
-    }
+    return _fallback_safety_assessment()
+
+
+async def get_gpt_safety_assessment_async(outputs: List[Dict], preliminary_checks: Dict) -> Dict:
+    """Async variant of get_gpt_safety_assessment."""
+    prompt = _build_safety_prompt(outputs, preliminary_checks)
+    key = prompt_key(prompt)
+    cached = _gpt_cache.get(key)
+    if cached is not None:
+        return cached
+    try:
+        response = await aclient.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=_safety_messages(prompt),
+            timeout=20
+        )
+        parsed = _parse_safety_reply(response.choices[0].message.content)
+        if parsed is not None:
+            _gpt_cache.put(key, parsed)
+            return parsed
+    except:
+        pass
+    
+    return _fallback_safety_assessment()
 
 
 def safety_agent(agent_outputs: List[Dict]) -> Dict[str, Any]:
@@ -285,16 +401,39 @@ def safety_agent(agent_outputs: List[Dict]) -> Dict[str, Any]:
         Safety assessment with risk level and recommendations
     """
     if not agent_outputs:
-        return {
-            "risk_level": "high",
-            "needs_human_review": True,
-            "explanation": "No agent outputs provided for safety evaluation",
-            "critical_alerts": [],
-            "contradictions": [],
-            "confidence_assessment": {"reliability": "unknown"},
-            "flags": ["NO_DATA_PROVIDED"]
-        }
+        return _no_data_safety_report()
     
+    preliminary = _preliminary_safety_checks(agent_outputs)
+    
+    # Get GPT safety assessment
+    gpt_assessment = get_gpt_safety_assessment(agent_outputs, preliminary)
+    return _assemble_safety_report(preliminary, gpt_assessment)
+
+
+async def safety_agent_async(agent_outputs: List[Dict]) -> Dict[str, Any]:
+    """Async safety agent; the GPT assessment does not block the event loop."""
+    if not agent_outputs:
+        return _no_data_safety_report()
+    
+    preliminary = _preliminary_safety_checks(agent_outputs)
+    gpt_assessment = await get_gpt_safety_assessment_async(agent_outputs, preliminary)
+    return _assemble_safety_report(preliminary, gpt_assessment)
+
+
+def _no_data_safety_report() -> Dict[str, Any]:
+    return {
+        "risk_level": "high",
+        "needs_human_review": True,
+        "explanation": "No agent outputs provided for safety evaluation",
+        "critical_alerts": [],
+        "contradictions": [],
+        "confidence_assessment": {"reliability": "unknown"},
+        "flags": ["NO_DATA_PROVIDED"]
+    }
+
+
+def _preliminary_safety_checks(agent_outputs: List[Dict]) -> Dict[str, Any]:
+    """Run the rule-based checks; this is also the context handed to GPT."""
     # Run all safety checks
     critical_alerts = check_for_critical_conditions(agent_outputs)
     contradictions = check_for_contradictions(agent_outputs)
@@ -304,22 +443,25 @@ def safety_agent(agent_outputs: List[Dict]) -> Dict[str, Any]:
     # Assess overall risk
     risk_level = assess_risk_level(critical_alerts, contradictions, confidence_assessment)
     
-    # Determine if human review needed
-    human_review = determine_human_review_needed(
-        risk_level, critical_alerts, contradictions, missing_agents
-    )
-    
-    # Prepare preliminary checks for GPT
-    preliminary = {
+    return {
         "critical_alerts": critical_alerts,
         "contradictions": contradictions,
         "confidence": confidence_assessment,
         "missing_data": missing_agents,
         "risk_level": risk_level
     }
+
+
+def _assemble_safety_report(preliminary: Dict[str, Any], gpt_assessment: Dict) -> Dict[str, Any]:
+    critical_alerts = preliminary["critical_alerts"]
+    contradictions = preliminary["contradictions"]
+    missing_agents = preliminary["missing_data"]
+    risk_level = preliminary["risk_level"]
     
-    # Get GPT safety assessment
-    gpt_assessment = get_gpt_safety_assessment(agent_outputs, preliminary)
+    # Determine if human review needed
+    human_review = determine_human_review_needed(
+        risk_level, critical_alerts, contradictions, missing_agents
+    )
     
     # Build final flags
     flags = []
@@ -338,7 +480,7 @@ def safety_agent(agent_outputs: List[Dict]) -> Dict[str, Any]:
         "review_reasons": human_review["reasons"],
         "critical_alerts": critical_alerts,
         "contradictions": contradictions,
-        "confidence_assessment": confidence_assessment,
+        "confidence_assessment": preliminary["confidence"],
         "missing_data_agents": missing_agents,
         "gpt_assessment": gpt_assessment,
         "flags": flags,
@@ -13,15 +13,42 @@ Features:
 5. Export capabilities for compliance
 """
 
+import atexit
 import json
 import os
 import hashlib
-from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
-from dataclasses import dataclass, asdict
+import threading
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Any, Optional, List, Tuple
+from dataclasses import dataclass, asdict, field
 from pathlib import Path
 import uuid
 
+try:
+    import orjson  # Optional: faster entry serialization and log scans
+except ImportError:
+    orjson = None
+
+
+def _loads_line(line: bytes) -> Any:
+    """Parse one log line; json handles what orjson rejects (NaN, huge ints)."""
+    if orjson is not None:
+        try:
+            return orjson.loads(line)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(line)
+
+
+def _canonical(data: Dict) -> bytes:
+    """Sorted-key, compact JSON for an entry; json covers what orjson rejects."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+        except TypeError:
+            pass
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode()
+
 
 @dataclass
 class AuditEntry:
@@ -55,13 +82,51 @@ class AuditEntry:
     entry_hash: str
 
 
+@dataclass
+class _CaseIndex:
+    """In-memory case_id index of one log file, built from its .idx sidecar."""
+    idx_read: int = 0         # Bytes of the .idx file consumed
+    covered: int = 0          # Log bytes [0, covered) are indexed
+    rows: Dict[str, List[tuple]] = field(default_factory=dict)  # json case_id -> [(offset, length)]
+
+
 class AuditLogger:
-    """Thread-safe audit logger with immutable entries."""
+    """
+    Thread-safe audit logger with immutable entries.
+    
+    Entries are buffered and group-committed: written in one append and
+    fsynced once flush_every entries are pending, or flush_interval seconds
+    after the first pending one, whichever comes first. Readers flush first,
+    so they always see every logged entry.
     
-    def __init__(self, log_dir: str = "audit_logs"):
+    Next to each day's log, audit_YYYYMMDD.idx gets one row per entry
+    (case_id, byte offset, length), so case lookups read only matching lines.
+    Offsets are taken from where each append actually landed, so they hold
+    when several processes write the same day's log. Anything the index does
+    not cover (older logs, a crash between writes) is indexed on first lookup.
+    """
+    
+    def __init__(self, log_dir: str = "audit_logs", flush_every: int = 32, flush_interval: float = 1.0):
         self.log_dir = Path(log_dir)
         self.log_dir.mkdir(exist_ok=True)
-        self.current_log_file = self.log_dir / f"audit_{datetime.now().strftime('%Y%m%d')}.jsonl"
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._fh = None
+        self._idx_fh = None
+        self._case_indexes: Dict[str, _CaseIndex] = {}
+        self._pending_lines: List[bytes] = []
+        self._pending_rows: List[tuple] = []  # (json case_id, offset in pending lines, length)
+        self._pending_bytes = 0
+        self._flush_timer: Optional[threading.Timer] = None
+        self._open_log_file(datetime.now())
+        atexit.register(self.close)
+    
+    def _open_log_file(self, now: datetime):
+        """Switch to the log file for now's date; each day's file is its own chain."""
+        self.current_log_file = self.log_dir / f"audit_{now.strftime('%Y%m%d')}.jsonl"
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        self._rotate_at = (midnight + timedelta(days=1)).timestamp()
         self._last_hash: Optional[str] = None
         self._load_last_hash()
     
@@ -69,18 +134,149 @@ class AuditLogger:
         """Load the hash of the last entry for chain integrity."""
         if self.current_log_file.exists():
             try:
-                with open(self.current_log_file, 'r') as f:
-                    lines = f.readlines()
+                with open(self.current_log_file, 'rb') as f:
+                    # Read back from the end just far enough to hold the last line
+                    end = f.seek(0, os.SEEK_END)
+                    size = 4096
+                    while True:
+                        f.seek(max(0, end - size))
+                        lines = f.read().splitlines()
+                        if len(lines) > 1 or size >= end:
+                            break
+                        size *= 2
                     if lines:
                         last_entry = json.loads(lines[-1])
                         self._last_hash = last_entry.get("entry_hash")
             except:
                 pass
     
+    def _append(self, entry_data: Dict) -> None:
+        """Chain, seal and buffer one entry."""
+        with self._lock:
+            now = datetime.now()
+            if now.timestamp() >= self._rotate_at:
+                self._close_handle()
+                self._open_log_file(now)
+            if self._fh is None:
+                # Unbuffered: flush() issues each batch as a single append
+                self._fh = open(self.current_log_file, 'ab', buffering=0)
+                self._idx_fh = open(self.current_log_file.with_suffix(".idx"), 'ab', buffering=0)
+            
+            entry_data["previous_hash"] = self._last_hash
+            line = self._seal_entry(entry_data)
+            self._pending_lines.append(line)
+            self._pending_rows.append((json.dumps(entry_data.get("case_id")), self._pending_bytes, len(line)))
+            self._pending_bytes += len(line)
+            self._last_hash = entry_data["entry_hash"]
+            
+            if len(self._pending_lines) >= self.flush_every:
+                self.flush()
+            elif self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def flush(self) -> None:
+        """Write pending entries through to disk."""
+        with self._lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if self._fh is not None and self._pending_lines:
+                data = b"".join(self._pending_lines)
+                base, contiguous = self._write_all(data)
+                # If another writer's append split the batch, the offsets are
+                # unknown; leave the rows out and let readers scan the tail
+                rows = b"".join(
+                    f"{key}\t{base + offset}\t{length}\n".encode()
+                    for key, offset, length in self._pending_rows
+                ) if contiguous else b""
+                # Written lines leave the buffer before fsync, which can fail
+                # after the data is already in the file
+                self._pending_lines.clear()
+                self._pending_rows.clear()
+                self._pending_bytes = 0
+                os.fsync(self._fh.fileno())
+                # The index can be rebuilt from the log, so it is not fsynced.
+                # A torn row would swallow the next one, so finish it too
+                view = memoryview(rows)
+                while view:
+                    view = view[self._idx_fh.write(view):]
+    
+    def _write_all(self, data: bytes) -> Tuple[int, bool]:
+        """
+        Append data to the log, retrying short writes. Returns the offset it
+        started at and whether it landed in one piece. On error the unwritten
+        part stays pending and the error propagates.
+        """
+        view = memoryview(data)
+        written = 0
+        base = None
+        contiguous = True
+        try:
+            while written < len(data):
+                n = self._fh.write(view[written:])
+                if not n:
+                    raise OSError(f"Audit log write stalled after {written} of {len(data)} bytes")
+                # An O_APPEND write leaves our position at the end of what it
+                # wrote, wherever other writers' appends put it
+                start = self._fh.tell() - n
+                if base is None:
+                    base = start
+                elif start != base + written:
+                    contiguous = False
+                written += n
+        except OSError:
+            if written:
+                # Lines already on disk must not be written twice; the rest of
+                # the batch reaches the index through the tail scan
+                self._pending_lines = [data[written:]]
+                self._pending_rows = []
+                self._pending_bytes = len(data) - written
+            raise
+        return base, contiguous
+    
+    def close(self) -> None:
+        """Flush pending entries and release the file handle."""
+        with self._lock:
+            self._close_handle()
+    
+    def _close_handle(self) -> None:
+        self.flush()
+        if self._fh is not None:
+            self._fh.close()
+            self._idx_fh.close()
+            self._fh = None
+            self._idx_fh = None
+    
     def _compute_hash(self, data: Dict) -> str:
         """Compute SHA-256 hash of entry data."""
-        serialized = json.dumps(data, sort_keys=True)
-        return hashlib.sha256(serialized.encode()).hexdigest()[:16]
+        return self._hash_serialized(json.dumps(data, sort_keys=True).encode())
+    
+    def _hash_serialized(self, serialized: bytes) -> str:
+        return hashlib.sha256(serialized).hexdigest()[:16]
+    
+    def _seal_entry(self, entry_data: Dict) -> bytes:
+        """
+        Add entry_hash to entry_data and return its log line. The line is the
+        canonical JSON the hash covers with entry_hash appended, so the entry
+        is serialized once and verification can hash the line's own bytes.
+        """
+        serialized = _canonical(entry_data)
+        entry_data["entry_hash"] = self._hash_serialized(serialized)
+        return b'%s,"entry_hash":"%s"}\n' % (serialized[:-1], entry_data["entry_hash"].encode())
+    
+    def _entry_hash_matches(self, line: bytes, entry: Dict) -> bool:
+        """Check a parsed log line against its stored entry_hash (removed from entry)."""
+        stored_hash = entry.pop("entry_hash", None)
+        body = line.rstrip(b"\n")
+        if isinstance(stored_hash, str):
+            # Sealed lines are the hashed bytes with entry_hash spliced in
+            suffix = b',"entry_hash":"%s"}' % stored_hash.encode()
+            if body.endswith(suffix) and self._hash_serialized(body[:-len(suffix)] + b"}") == stored_hash:
+                return True
+        # Lines written before _seal_entry kept insertion order; re-serialize
+        return self._compute_hash(entry) == stored_hash
     
     def _hash_inputs(self, inputs: Dict[str, Any]) -> str:
         """Hash input data to avoid storing PHI directly."""
@@ -132,17 +328,10 @@ class AuditLogger:
                     for k, v in input_data.items()
                 }
             },
-            "previous_hash": self._last_hash
         }
         
-        # Compute and add entry hash
-        entry_data["entry_hash"] = self._compute_hash(entry_data)
-        
-        # Write to log file
-        with open(self.current_log_file, 'a') as f:
-            f.write(json.dumps(entry_data) + "\n")
-        
-        self._last_hash = entry_data["entry_hash"]
+        # Chain, hash and write to log file
+        self._append(entry_data)
         
         return audit_id
     
@@ -166,63 +355,57 @@ class AuditLogger:
             "error_type": error_type,
             "error_message": error_message,
             "context": context or {},
-            "previous_hash": self._last_hash
         }
         
-        entry_data["entry_hash"] = self._compute_hash(entry_data)
-        
-        with open(self.current_log_file, 'a') as f:
-            f.write(json.dumps(entry_data) + "\n")
-        
-        self._last_hash = entry_data["entry_hash"]
+        self._append(entry_data)
         
         return audit_id
     
     def verify_chain_integrity(self) -> Dict[str, Any]:
         """Verify the integrity of the audit log chain."""
+        self.flush()
         if not self.current_log_file.exists():
             return {"valid": True, "entries": 0, "message": "No log file exists"}
         
-        with open(self.current_log_file, 'r') as f:
-            lines = f.readlines()
-        
-        if not lines:
-            return {"valid": True, "entries": 0, "message": "Log file is empty"}
-        
+        entries = 0
         valid = True
         broken_at = None
         previous_hash = None
         
-        for i, line in enumerate(lines):
-            try:
-                entry = json.loads(line)
+        # Stream the file; after a break, lines are only counted
+        with open(self.current_log_file, 'rb') as f:
+            for i, line in enumerate(f):
+                entries += 1
+                if not valid:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    valid = False
+                    broken_at = i
+                    continue
                 
                 # Verify previous hash chain
                 if entry.get("previous_hash") != previous_hash:
                     valid = False
                     broken_at = i
-                    break
+                    continue
                 
                 # Verify entry hash
-                stored_hash = entry.pop("entry_hash")
-                computed_hash = self._compute_hash(entry)
-                entry["entry_hash"] = stored_hash
-                
-                if stored_hash != computed_hash:
+                stored_hash = entry.get("entry_hash")
+                if not self._entry_hash_matches(line, entry):
                     valid = False
                     broken_at = i
-                    break
+                    continue
                 
                 previous_hash = stored_hash
-                
-            except json.JSONDecodeError:
-                valid = False
-                broken_at = i
-                break
+        
+        if not entries:
+            return {"valid": True, "entries": 0, "message": "Log file is empty"}
         
         return {
             "valid": valid,
-            "entries": len(lines),
+            "entries": entries,
             "broken_at_entry": broken_at,
             "message": "Chain verified successfully" if valid else f"Chain broken at entry {broken_at}"
         }
@@ -230,18 +413,68 @@ class AuditLogger:
     def get_entries_for_case(self, case_id: str) -> List[Dict]:
         """Retrieve all audit entries for a specific case."""
         entries = []
+        key = json.dumps(case_id)
         
-        for log_file in self.log_dir.glob("audit_*.jsonl"):
-            with open(log_file, 'r') as f:
-                for line in f:
+        with self._lock:
+            self.flush()
+            for log_file in self.log_dir.glob("audit_*.jsonl"):
+                ranges = self._case_index(log_file).rows.get(key)
+                if not ranges:
+                    continue
+                with open(log_file, 'rb') as f:
+                    for offset, length in ranges:
+                        f.seek(offset)
+                        try:
+                            entry = _loads_line(f.read(length))
+                            if entry.get("case_id") == case_id:
+                                entries.append(entry)
+                        except:
+                            continue
+        
+        return sorted(entries, key=lambda x: x.get("timestamp", ""))
+    
+    def _case_index(self, log_file: Path) -> _CaseIndex:
+        """Bring log_file's case index up to date: new .idx rows, then any unindexed tail."""
+        size = log_file.stat().st_size
+        index = self._case_indexes.get(log_file.name)
+        if index is None or size < index.covered:  # New, or the log was rewritten
+            index = self._case_indexes[log_file.name] = _CaseIndex()
+        
+        idx_file = log_file.with_suffix(".idx")
+        if idx_file.exists():
+            rows = []
+            with open(idx_file, 'rb') as f:
+                f.seek(index.idx_read)
+                for row in f:
+                    if not row.endswith(b"\n"):
+                        break  # Still being written
+                    index.idx_read += len(row)
                     try:
-                        entry = json.loads(line)
-                        if entry.get("case_id") == case_id:
-                            entries.append(entry)
-                    except:
+                        key, offset, length = row[:-1].decode().rsplit("\t", 2)
+                        rows.append((int(offset), int(length), key))
+                    except ValueError:
                         continue
+            # Writers append their rows in flush order, not offset order
+            for offset, length, key in sorted(rows):
+                if offset > index.covered:
+                    break  # Gap in the index; the tail scan below fills it
+                if offset == index.covered:
+                    index.rows.setdefault(key, []).append((offset, length))
+                    index.covered += length
         
-        return sorted(entries, key=lambda x: x.get("timestamp", ""))
+        if index.covered < size:
+            with open(log_file, 'rb') as f:
+                f.seek(index.covered)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        key = json.dumps(_loads_line(line).get("case_id"))
+                        index.rows.setdefault(key, []).append((index.covered, len(line)))
+                    except:
+                        pass
+                    index.covered += len(line)
+        return index
     
     def export_for_compliance(
         self,
@@ -250,13 +483,28 @@ class AuditLogger:
         output_file: str = None
     ) -> str:
         """Export audit logs for compliance review."""
+        self.flush()
         entries = []
         
+        # Timestamps are UTC and files are named by local date, so a file can
+        # hold entries a day either side of its name; skip files outside that
+        first_day = _date_prefix(start_date)
+        last_day = _date_prefix(end_date)
+        
         for log_file in sorted(self.log_dir.glob("audit_*.jsonl")):
-            with open(log_file, 'r') as f:
+            try:
+                file_day = datetime.strptime(log_file.stem[len("audit_"):], "%Y%m%d").date()
+            except ValueError:
+                file_day = None
+            if file_day is not None:
+                if first_day and file_day + timedelta(days=1) < first_day:
+                    continue
+                if last_day and file_day - timedelta(days=1) > last_day:
+                    continue
+            with open(log_file, 'rb') as f:
                 for line in f:
                     try:
-                        entry = json.loads(line)
+                        entry = _loads_line(line)
                         ts = entry.get("timestamp", "")
                         
                         # Filter by date if specified
@@ -285,6 +533,16 @@ class AuditLogger:
         return str(output_path)
 
 
+def _date_prefix(value: Optional[str]) -> Optional[date]:
+    """The date an ISO timestamp bound starts with (YYYY-MM-DD), if it does."""
+    if not value or value[4:5] != "-" or value[7:8] != "-":
+        return None
+    try:
+        return date.fromisoformat(value[:10])
+    except ValueError:
+        return None
+
+
 # Global audit logger instance
 _audit_logger: Optional[AuditLogger] = None
 
@@ -11,14 +11,18 @@ Features:
 """
 
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from dataclasses import dataclass, field, asdict
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+import atexit
 import hashlib
+import hmac
 import secrets
 import json
 import os
+import threading
+import time
 import jwt
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -36,6 +40,12 @@ USERS_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "users.json")
 
 security = HTTPBearer(auto_error=False)
 
+# last_login updates are batched and written this many seconds after the first
+LAST_LOGIN_PERSIST_DELAY = 1.0
+
+# Decoded tokens kept so repeat requests skip signature verification
+JWT_CACHE_SIZE = 10_000
+
 
 # ═══════════════════════════════════════════════════════════════════════════════
 # DATA MODELS
@@ -79,20 +89,35 @@ class AuthTokens:
 # PASSWORD HASHING
 # ═══════════════════════════════════════════════════════════════════════════════
 
+# scrypt cost parameters for new hashes (about 16 MiB of memory per hash)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + (1 << 20), dklen=32)
+
+
 def hash_password(password: str) -> str:
-    """Hash a password using SHA-256 with salt."""
-    salt = secrets.token_hex(16)
-    password_hash = hashlib.sha256(f"{salt}{password}".encode()).hexdigest()
-    return f"{salt}:{password_hash}"
+    """Hash a password using scrypt with a random salt."""
+    salt = secrets.token_bytes(16)
+    derived = _scrypt(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${salt.hex()}${derived.hex()}"
 
 
 def verify_password(password: str, password_hash: str) -> bool:
-    """Verify a password against its hash."""
+    """Verify a password against its hash, in constant time."""
     try:
-        salt, stored_hash = password_hash.split(":")
-        computed_hash = hashlib.sha256(f"{salt}{password}".encode()).hexdigest()
-        return computed_hash == stored_hash
-    except ValueError:
+        if password_hash.startswith("scrypt$"):
+            _, n, r, p, salt, stored_hash = password_hash.split("$")
+            computed_hash = _scrypt(password, bytes.fromhex(salt), int(n), int(r), int(p)).hex()
+        else:
+            # Legacy salted SHA-256 hashes from before scrypt
+            salt, stored_hash = password_hash.split(":")
+            computed_hash = hashlib.sha256(f"{salt}{password}".encode()).hexdigest()
+        return hmac.compare_digest(computed_hash, stored_hash)
+    except (ValueError, TypeError):  # Malformed hash, or non-ASCII from compare_digest
         return False
 
 
@@ -115,57 +140,118 @@ def _load_users() -> Dict[str, Dict]:
 
 
 def _save_users(users: Dict[str, Dict]):
-    """Save users to file."""
+    """Save users to file, atomically so readers never see a partial write."""
+    global _users_mtime
     _ensure_data_dir()
-    with open(USERS_FILE, "w") as f:
+    tmp_path = f"{USERS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
         json.dump(users, f, indent=2)
+    os.replace(tmp_path, USERS_FILE)
+    _users_mtime = _users_file_mtime()
+
+
+# Users are served from memory; USERS_FILE is only re-read when it changes on
+# disk (e.g. written by another worker process)
+_users_lock = threading.RLock()
+_users_cache: Optional[Dict[str, Dict]] = None
+_email_index: Dict[str, str] = {}
+_users_mtime: Optional[int] = None
+_pending_logins: Dict[str, str] = {}  # user id -> last_login not yet saved
+_persist_timer: Optional[threading.Timer] = None
+
+
+def _users_file_mtime() -> Optional[int]:
+    try:
+        return os.stat(USERS_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def _users() -> Dict[str, Dict]:
+    """The user records by ID. Call with _users_lock held."""
+    global _users_cache, _email_index, _users_mtime
+    mtime = _users_file_mtime()
+    if _users_cache is None or mtime != _users_mtime:
+        users = _load_users()
+        for user_id, last_login in _pending_logins.items():
+            if user_id in users:
+                users[user_id]["last_login"] = last_login
+        email_index: Dict[str, str] = {}
+        for user_id, user_data in users.items():
+            email_index.setdefault(user_data.get("email"), user_id)  # First match wins
+        _users_cache, _email_index, _users_mtime = users, email_index, mtime
+    return _users_cache
+
+
+def _persist_pending_logins():
+    """Write out last_login updates that are still only in memory."""
+    global _persist_timer
+    with _users_lock:
+        _persist_timer = None
+        if _pending_logins:
+            users = _users()
+            _pending_logins.clear()
+            _save_users(users)
+
+
+atexit.register(_persist_pending_logins)
 
 
 def get_user_by_email(email: str) -> Optional[User]:
     """Get a user by email."""
-    users = _load_users()
-    for user_data in users.values():
-        if user_data.get("email") == email:
-            return User(**user_data)
+    with _users_lock:
+        users = _users()
+        user_id = _email_index.get(email)
+        if user_id is not None:
+            return User(**users[user_id])
     return None
 
 
 def get_user_by_id(user_id: str) -> Optional[User]:
     """Get a user by ID."""
-    users = _load_users()
-    if user_id in users:
-        return User(**users[user_id])
+    with _users_lock:
+        users = _users()
+        if user_id in users:
+            return User(**users[user_id])
     return None
 
 
 def create_user(email: str, password: str, name: str, role: str = "user") -> User:
     """Create a new user."""
-    # Check if email already exists
-    if get_user_by_email(email):
-        raise ValueError("Email already registered")
-    
-    user_id = f"USER-{secrets.token_hex(8).upper()}"
-    user = User(
-        id=user_id,
-        email=email,
-        password_hash=hash_password(password),
-        name=name,
-        role=role
-    )
-    
-    users = _load_users()
-    users[user_id] = asdict(user)
-    _save_users(users)
+    with _users_lock:
+        # Check if email already exists
+        users = _users()
+        if email in _email_index:
+            raise ValueError("Email already registered")
+        
+        user_id = f"USER-{secrets.token_hex(8).upper()}"
+        user = User(
+            id=user_id,
+            email=email,
+            password_hash=hash_password(password),
+            name=name,
+            role=role
+        )
+        
+        users[user_id] = asdict(user)
+        _email_index.setdefault(email, user_id)
+        _pending_logins.clear()  # Saved along with the new user
+        _save_users(users)
     
     return user
 
 
 def update_last_login(user_id: str):
     """Update user's last login timestamp."""
-    users = _load_users()
-    if user_id in users:
-        users[user_id]["last_login"] = datetime.utcnow().isoformat()
-        _save_users(users)
+    global _persist_timer
+    with _users_lock:
+        users = _users()
+        if user_id in users:
+            users[user_id]["last_login"] = _pending_logins[user_id] = datetime.utcnow().isoformat()
+            if _persist_timer is None:
+                _persist_timer = threading.Timer(LAST_LOGIN_PERSIST_DELAY, _persist_pending_logins)
+                _persist_timer.daemon = True
+                _persist_timer.start()
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -213,10 +299,25 @@ def create_tokens(user: User) -> AuthTokens:
     )
 
 
+# Raw token -> (exp, payload) for tokens that verified; oldest evicted first
+_jwt_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+_jwt_cache_lock = threading.Lock()
+
+
 def decode_token(token: str) -> Dict[str, Any]:
     """Decode and validate a JWT token."""
+    hit = _jwt_cache.get(token)
+    if hit is not None and hit[0] > time.time():
+        return dict(hit[1])
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        exp = payload.get("exp")
+        if isinstance(exp, (int, float)):
+            with _jwt_cache_lock:
+                _jwt_cache.pop(token, None)
+                while len(_jwt_cache) >= JWT_CACHE_SIZE:
+                    del _jwt_cache[next(iter(_jwt_cache))]
+                _jwt_cache[token] = (exp, dict(payload))
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
@@ -48,7 +48,7 @@ class EvidenceStrength(str, Enum):
     ABSENT = "absent"          # Expected finding not present
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Evidence:
     """Individual piece of clinical evidence"""
     type: EvidenceType
@@ -71,7 +71,7 @@ class Evidence:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class Finding:
     """Clinical finding with supporting evidence"""
     name: str
@@ -90,7 +90,7 @@ class Finding:
         }
 
 
-@dataclass
+@dataclass(slots=True)
 class DiagnosticHypothesis:
     """A potential diagnosis with supporting and opposing evidence"""
     diagnosis: str
@@ -0,0 +1,52 @@
+# app/core/gpt_batcher.py
+"""
+OpenAI Batch API Helper for MADN-X
+
+For offline corpus runs where latency does not matter, run_batch_job sends
+chat completion requests through the OpenAI Batch API, which is billed at a
+discount, and waits for the results.
+"""
+
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+
+def run_batch_job(
+    client: Any,
+    requests: List[Dict[str, Any]],
+    poll_interval: float = 30.0,
+    completion_window: str = "24h"
+) -> List[Optional[str]]:
+    """
+    Run chat completion requests through the OpenAI Batch API and wait for them.
+
+    Returns the reply content per request, in order, with None for any request
+    that failed or is missing from the output. Meant for offline runs: batches
+    can take up to the completion window to finish.
+    """
+    if not requests:
+        return []
+
+    lines = "\n".join(
+        json.dumps({"custom_id": str(i), "method": "POST", "url": "/v1/chat/completions", "body": body})
+        for i, body in enumerate(requests)
+    )
+    input_file = client.files.create(file=("requests.jsonl", lines.encode()), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=input_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window=completion_window
+    )
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+
+    results: List[Optional[str]] = [None] * len(requests)
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            row = json.loads(line)
+            response = row.get("response") or {}
+            if response.get("status_code") == 200:
+                results[int(row["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+    return results
@@ -0,0 +1,73 @@
+# app/core/gpt_cache.py
+"""
+GPT Response Cache for MADN-X
+
+Replayed cases (test runs, re-analysis of a corpus) send agents the same
+prompts again. GPTResponseCache keeps parsed GPT replies keyed by the SHA-1
+of the prompt in a bounded in-memory LRU, optionally backed by a SQLite file
+so hits survive restarts and are shared between worker processes.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    import orjson  # Optional: faster JSON encoding/decoding
+except ImportError:
+    orjson = None
+
+
+def prompt_key(prompt: str) -> str:
+    """Cache key for a prompt."""
+    return hashlib.sha1(prompt.encode()).hexdigest()
+
+
+class GPTResponseCache:
+    """
+    Bounded LRU of parsed GPT replies, with optional SQLite persistence.
+
+    Values are stored as JSON and decoded on every hit, so callers always get
+    a fresh copy they are free to mutate.
+    """
+
+    def __init__(self, maxsize: int = 1024, path: Optional[str] = None):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS gpt_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self._db.commit()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT value FROM gpt_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    value = row[0]
+                    self._remember(key, value)
+        if value is None:
+            return None
+        return orjson.loads(value) if orjson is not None else json.loads(value)
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        value = orjson.dumps(result).decode() if orjson is not None else json.dumps(result)
+        with self._lock:
+            self._remember(key, value)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO gpt_cache (key, value) VALUES (?, ?)", (key, value))
+                self._db.commit()
+
+    def _remember(self, key: str, value: str) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
@@ -3,7 +3,8 @@ from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel, EmailStr
 from typing import Optional, Dict, Any, List
 from fastapi.responses import FileResponse
-import uuid, os, time
+from fastapi.concurrency import run_in_threadpool
+import asyncio, uuid, os, time
 
 from .intake import process_case
 from .explainability import generate_explanation
@@ -13,13 +14,13 @@ from .auth import (
     create_user, authenticate_user, create_tokens, refresh_access_token,
     get_current_user, require_auth, User, AuthTokens
 )
-from app.agents.radiologist import radiologist_agent
-from app.agents.cardiologist import cardiologist_agent
+from app.agents.radiologist import radiologist_agent, radiologist_agent_async
+from app.agents.cardiologist import cardiologist_agent, cardiologist_agent_async
 from app.agents.pulmonologist import pulmonologist_agent
 from app.agents.pathologist import pathologist_agent
 from app.agents.discussion_agent import run_discussion  # your Day 5 util
 from app.agents.consensus_agent import build_final_diagnosis  # your Day 6 util
-from app.agents.safety_agent import safety_agent           # your Day 7 util
+from app.agents.safety_agent import safety_agent_async     # your Day 7 util
 from app.utils.pdf_report import generate_pdf_report       # NEW util
 
 router = APIRouter()
@@ -359,36 +360,51 @@ def _weighted_merge(agent_outputs):
     return merged, top, rationales.get(top, [])
 
 
+async def _local_agent(agent, text: str) -> Dict[str, Any]:
+    # Pattern scans are CPU-bound; keep them off the event loop
+    return await run_in_threadpool(agent, text)
+
+
+async def run_specialist_agents(
+    radiology: Optional[str] = None,
+    ecg: Optional[str] = None,
+    symptoms_text: Optional[str] = None,
+    lab_text: Optional[str] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Run the specialist agents for the inputs provided, concurrently.
+    
+    The agents are independent and each may wait on GPT, so a case takes as
+    long as its slowest agent instead of the sum of all of them. Reports are
+    keyed by agent name in the usual radiologist, cardiologist, pulmonologist,
+    pathologist order.
+    """
+    calls = {}
+    if radiology:
+        calls["radiologist"] = radiologist_agent_async(radiology)
+    if ecg:
+        calls["cardiologist"] = cardiologist_agent_async(ecg)
+    if symptoms_text:
+        calls["pulmonologist"] = _local_agent(pulmonologist_agent, symptoms_text)
+    if lab_text:
+        calls["pathologist"] = _local_agent(pathologist_agent, lab_text)
+    
+    results = await asyncio.gather(*calls.values())
+    return dict(zip(calls, results))
+
+
 @router.post("/diagnose")
-def multi_agent_reasoning(payload: CaseRequest):
+async def multi_agent_reasoning(payload: CaseRequest):
     """Main diagnostic endpoint with explainability, audit logging, and metrics."""
     
     # Start timing
     start_time = time.time()
     case_id = payload.case_id or f"CASE-{uuid.uuid4().hex[:8].upper()}"
     
-    agent_outputs = []
-    agent_outputs_dict = {}
-
-    if payload.radiology:
-        result = radiologist_agent(payload.radiology)
-        agent_outputs.append(result)
-        agent_outputs_dict["radiologist"] = result
-
-    if payload.ecg:
-        result = cardiologist_agent(payload.ecg)
-        agent_outputs.append(result)
-        agent_outputs_dict["cardiologist"] = result
-
-    if payload.symptoms_text:
-        result = pulmonologist_agent(payload.symptoms_text)
-        agent_outputs.append(result)
-        agent_outputs_dict["pulmonologist"] = result
-
-    if payload.lab_text:
-        result = pathologist_agent(payload.lab_text)
-        agent_outputs.append(result)
-        agent_outputs_dict["pathologist"] = result
+    agent_outputs_dict = await run_specialist_agents(
+        payload.radiology, payload.ecg, payload.symptoms_text, payload.lab_text
+    )
+    agent_outputs = list(agent_outputs_dict.values())
 
     if not agent_outputs:
         return {"error": "No medical inputs provided.", "case_id": case_id}
@@ -438,7 +454,8 @@ def multi_agent_reasoning(payload: CaseRequest):
     if payload.explain:
         try:
             differential_diagnoses = list(merged.keys())[:5] if isinstance(merged, dict) else []
-            explanation = generate_explanation(
+            explanation = await run_in_threadpool(
+                generate_explanation,
                 agent_outputs=agent_outputs_dict,
                 final_diagnosis=top_label.split("-")[0].strip() if top_label else "Unknown",
                 final_confidence=confidence,
@@ -452,7 +469,8 @@ def multi_agent_reasoning(payload: CaseRequest):
     # Record metrics
     try:
         tracker = get_metrics_tracker()
-        tracker.record_diagnosis(
+        await run_in_threadpool(
+            tracker.record_diagnosis,
             case_id=case_id,
             predicted_diagnosis=top_label,
             predicted_confidence=confidence,
@@ -468,7 +486,9 @@ def multi_agent_reasoning(payload: CaseRequest):
     # Audit log
     try:
         logger = get_audit_logger()
-        audit_id = logger.log_diagnosis(
+        # Appends may fsync the log
+        audit_id = await run_in_threadpool(
+            logger.log_diagnosis,
             case_id=case_id,
             final_diagnosis=top_label,
             confidence=confidence,
@@ -491,19 +511,27 @@ def multi_agent_reasoning(payload: CaseRequest):
 
 # Day 5: discussion
 @router.post("/discussion")
-def discussion_endpoint(payload: DiscussionRequest):
+async def discussion_endpoint(payload: DiscussionRequest):
     try:
         prior = payload.prior_reports.copy() if payload.prior_reports else {}
-        if payload.radiology and "radiologist_report" not in prior:
-            prior["radiologist_report"] = radiologist_agent(payload.radiology)
-        if payload.ecg and "cardiology_report" not in prior:
-            prior["cardiology_report"] = cardiologist_agent(payload.ecg)
-        if payload.symptoms and "pulmonology_report" not in prior:
-            prior["pulmonology_report"] = pulmonologist_agent(payload.symptoms)
-        if payload.labs and "pathology_report" not in prior:
-            prior["pathology_report"] = pathologist_agent(payload.labs)
-
-        return run_discussion(
+        reports = await run_specialist_agents(
+            payload.radiology if "radiologist_report" not in prior else None,
+            payload.ecg if "cardiology_report" not in prior else None,
+            payload.symptoms if "pulmonology_report" not in prior else None,
+            payload.labs if "pathology_report" not in prior else None
+        )
+        for agent, key in (
+            ("radiologist", "radiologist_report"),
+            ("cardiologist", "cardiology_report"),
+            ("pulmonologist", "pulmonology_report"),
+            ("pathologist", "pathology_report"),
+        ):
+            if agent in reports:
+                prior[key] = reports[agent]
+
+        # The debate itself is a chain of blocking GPT calls
+        return await run_in_threadpool(
+            run_discussion,
             symptoms=payload.symptoms,
             labs=payload.labs,
             prior_reports=prior,
@@ -514,38 +542,26 @@ def discussion_endpoint(payload: DiscussionRequest):
 
 # Day 6: consensus object builder (if you want the fancier struct)
 @router.post("/consensus")
-def consensus_endpoint(payload: CaseRequest):
-    agent_reports = {}
-    if payload.radiology:
-        agent_reports["radiologist"] = radiologist_agent(payload.radiology)
-    if payload.ecg:
-        agent_reports["cardiologist"] = cardiologist_agent(payload.ecg)
-    if payload.symptoms_text:
-        agent_reports["pulmonologist"] = pulmonologist_agent(payload.symptoms_text)
-    if payload.lab_text:
-        agent_reports["pathologist"] = pathologist_agent(payload.lab_text)
+async def consensus_endpoint(payload: CaseRequest):
+    agent_reports = await run_specialist_agents(
+        payload.radiology, payload.ecg, payload.symptoms_text, payload.lab_text
+    )
 
     if not agent_reports:
         raise HTTPException(status_code=400, detail="No agent inputs provided.")
-    return build_final_diagnosis(agent_reports)
+    return await run_in_threadpool(build_final_diagnosis, agent_reports)
 
 # Day 7: safety
 @router.post("/safety")
-def safety_check(payload: CaseRequest):
-    agent_outputs = []
-    if payload.radiology:
-        agent_outputs.append(radiologist_agent(payload.radiology))
-    if payload.ecg:
-        agent_outputs.append(cardiologist_agent(payload.ecg))
-    if payload.symptoms_text:
-        agent_outputs.append(pulmonologist_agent(payload.symptoms_text))
-    if payload.lab_text:
-        agent_outputs.append(pathologist_agent(payload.lab_text))
+async def safety_check(payload: CaseRequest):
+    agent_outputs = list((await run_specialist_agents(
+        payload.radiology, payload.ecg, payload.symptoms_text, payload.lab_text
+    )).values())
     if not agent_outputs:
         raise HTTPException(status_code=400, detail="No agent outputs to evaluate.")
 
     # your safety_agent should tolerate both dicts and JSON strings
-    safety_result = safety_agent(agent_outputs)
+    safety_result = await safety_agent_async(agent_outputs)
     return {
         "safety_agent": safety_result,
         "agents_checked": [getattr(a, "get", lambda _:_ )("agent") if isinstance(a, dict) else "unknown" for a in agent_outputs],
@@ -558,19 +574,13 @@ def safety_check(payload: CaseRequest):
 # ============================================================================
 
 @router.post("/report/pdf", tags=["Reports"])
-def report_pdf(payload: PdfRequest):
+async def report_pdf(payload: PdfRequest):
     """Generate PDF report from case data."""
     # 1) run agents
     case = payload.case
-    agent_outputs = {}
-    if case.radiology:
-        agent_outputs["radiologist"] = radiologist_agent(case.radiology)
-    if case.ecg:
-        agent_outputs["cardiologist"] = cardiologist_agent(case.ecg)
-    if case.symptoms_text:
-        agent_outputs["pulmonologist"] = pulmonologist_agent(case.symptoms_text)
-    if case.lab_text:
-        agent_outputs["pathologist"] = pathologist_agent(case.lab_text)
+    agent_outputs = await run_specialist_agents(
+        case.radiology, case.ecg, case.symptoms_text, case.lab_text
+    )
 
     # 2) get consensus
     merged, top, rationale = _weighted_merge(agent_outputs.values())
@@ -581,7 +591,8 @@ def report_pdf(payload: PdfRequest):
     filename = f"report_{payload.case_id}_{uuid.uuid4().hex[:8]}.pdf"
     path = os.path.join("reports", filename)
 
-    generate_pdf_report(
+    await run_in_threadpool(
+        generate_pdf_report,
         path,
         case_id=payload.case_id,
         patient_case=case.model_dump(),
@@ -1,5 +1,12 @@
 # app/core/utils.py
-from typing import Dict, Any
+import re
+from bisect import bisect_right
+from typing import Dict, Any, FrozenSet, List, Optional, Set
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants, sre_parse
 
 REQUIRED_FIELDS = ["radiology", "ecg", "symptoms_text", "lab_text"]
 
@@ -36,3 +43,100 @@ def detect_missing(payload: Dict[str, Any]) -> Dict[str, str]:
         messages["lab_text"] = "Lab information missing."
 
     return messages
+
+
+def required_literals(pattern: str) -> Optional[FrozenSet[str]]:
+    """
+    Literals of which every match of the regex must contain at least one, for
+    use as a cheap substring gate before running it. Returns None when no such
+    literal can be derived (the pattern then has to run unconditionally).
+
+    Only sound for patterns compiled without re.IGNORECASE.
+    """
+    return _required_literals(sre_parse.parse(pattern))
+
+
+def _required_literals(items) -> Optional[FrozenSet[str]]:
+    best: Optional[FrozenSet[str]] = None
+    run: List[str] = []
+
+    def consider(candidate: Optional[FrozenSet[str]]) -> None:
+        # Prefer the candidate whose shortest literal is longest (most selective)
+        nonlocal best
+        if candidate and (best is None or min(map(len, candidate)) > min(map(len, best))):
+            best = candidate
+
+    def flush() -> None:
+        if run:
+            consider(frozenset(["".join(run)]))
+            run.clear()
+
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run.append(chr(av))
+            continue
+        flush()
+        if op is sre_constants.SUBPATTERN:
+            consider(_required_literals(av[-1]))
+        elif op is sre_constants.BRANCH:
+            alternatives = [_required_literals(alt) for alt in av[1]]
+            if all(alternatives):
+                consider(frozenset().union(*alternatives))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            consider(_required_literals(av[2]))
+    flush()
+    return best
+
+
+# Printable ASCII plus the control characters both engines treat alike. Python's
+# \s also matches \x1c-\x1f (and Unicode spaces), Hyperscan's \s does not.
+_HYPERSCAN_DIVERGENT_RE = re.compile(r"[^\x00-\x1b\x20-\x7f]")
+
+
+def hyperscan_compatible(text: str) -> bool:
+    """
+    True when a Hyperscan scan of text.encode() reports the same matches, at the
+    same offsets, as the re module would on text: ASCII only (byte offsets equal
+    str offsets, word characters agree) and no information-separator controls.
+    """
+    return text.isascii() and _HYPERSCAN_DIVERGENT_RE.search(text) is None
+
+
+# Joins records for a batched scan. No pattern in the agents can consume it
+# whole, but hyperscan_scan_records stays exact even if one could.
+RECORD_SEPARATOR = "\n\x00"
+
+
+def _collect_span(pattern_id: int, start: int, end: int, flags: int, hits: List) -> None:
+    hits.append((pattern_id, start, end))
+
+
+def hyperscan_scan_records(db, scratch, texts: List[str]) -> List[Optional[Set[int]]]:
+    """
+    Scan many texts with a single Hyperscan call over their concatenation.
+
+    Returns, per text, the ids of the patterns matching inside it, or None when
+    a match straddling a separator may have hidden one (Hyperscan reports only
+    the leftmost start per end offset); such texts must be rescanned alone.
+    db must be compiled with HS_FLAG_SOM_LEFTMOST and every text must pass
+    hyperscan_compatible.
+    """
+    starts = []
+    pos = 0
+    for text in texts:
+        starts.append(pos)
+        pos += len(text) + len(RECORD_SEPARATOR)
+    hits: List = []
+    db.scan(RECORD_SEPARATOR.join(texts).encode(), match_event_handler=_collect_span, context=hits, scratch=scratch)
+
+    results: List[Optional[Set[int]]] = [set() for _ in texts]
+    for pattern_id, start, end in hits:
+        i = bisect_right(starts, start) - 1
+        if end <= starts[i] + len(texts[i]):
+            if results[i] is not None:
+                results[i].add(pattern_id)
+            continue
+        j = bisect_right(starts, end - 1) - 1
+        if end <= starts[j] + len(texts[j]):
+            results[j] = None
+    return results
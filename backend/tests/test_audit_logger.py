@@ -0,0 +1,322 @@
+"""
+MADN-X Audit Logger Tests
+==========================
+Hash chain sealing and verification, including logs written before lines
+were sealed, and the case_id sidecar index.
+
+Run with: pytest tests/test_audit_logger.py -v
+"""
+
+import errno
+import hashlib
+import json
+import pytest
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core.audit_logger import AuditLogger
+
+
+def _log(logger, case_id, confidence=0.5):
+    return logger.log_diagnosis(
+        case_id=case_id,
+        final_diagnosis="Pulmonary Embolism",
+        confidence=confidence,
+        diagnostic_certainty="possible",
+        agents_used=["radiologist"],
+        agent_outputs={"radiologist": {"findings": [{"name": "Filling defect"}]}},
+        input_data={"radiology": "CTPA: filling defect"},
+        critical_flags=["CRITICAL: Filling defect"]
+    )
+
+
+def _legacy_line(entry, previous_hash):
+    """A line as written before sealing: insertion order, hash of the sorted dump."""
+    entry = {**entry, "previous_hash": previous_hash}
+    entry["entry_hash"] = hashlib.sha256(json.dumps(entry, sort_keys=True).encode()).hexdigest()[:16]
+    return json.dumps(entry) + "\n", entry["entry_hash"]
+
+
+def _entry(i, case_id="LEGACY"):
+    return {
+        "audit_id": f"AUDIT-LEGACY{i}",
+        "timestamp": f"2024-01-01T00:00:0{i}+00:00",
+        "event_type": "diagnosis",
+        "case_id": case_id,
+        "confidence": 0.5,
+        "final_diagnosis": "Pneumonia é",
+    }
+
+
+@pytest.fixture
+def logger(tmp_path):
+    audit_logger = AuditLogger(str(tmp_path))
+    yield audit_logger
+    audit_logger.close()
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CHAIN INTEGRITY
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestChainIntegrity:
+    """Sealed lines verify, tampering is caught, lines from before sealing still verify."""
+
+    def test_sealed_entries_verify(self, logger):
+        for i in range(5):
+            _log(logger, f"CASE-{i}")
+        result = logger.verify_chain_integrity()
+
+        assert result["valid"] is True
+        assert result["entries"] == 5
+
+    def test_line_carries_its_hash_last(self, logger):
+        _log(logger, "CASE-1")
+        logger.flush()
+        line = logger.current_log_file.read_bytes().splitlines()[0]
+        entry = json.loads(line)
+
+        assert line.endswith(f',"entry_hash":"{entry["entry_hash"]}"}}'.encode())
+
+    def test_tampered_entry_breaks_chain(self, logger):
+        for i in range(4):
+            _log(logger, f"CASE-{i}")
+        logger.close()
+        lines = logger.current_log_file.read_text().splitlines(True)
+        lines[2] = lines[2].replace('"confidence":0.5', '"confidence":0.9')
+        logger.current_log_file.write_text("".join(lines))
+
+        result = AuditLogger(str(logger.log_dir)).verify_chain_integrity()
+        assert result["valid"] is False
+        assert result["broken_at_entry"] == 2
+        assert result["entries"] == 4
+
+    def test_removed_entry_breaks_chain(self, logger):
+        for i in range(4):
+            _log(logger, f"CASE-{i}")
+        logger.close()
+        lines = logger.current_log_file.read_text().splitlines(True)
+        del lines[1]
+        logger.current_log_file.write_text("".join(lines))
+
+        result = AuditLogger(str(logger.log_dir)).verify_chain_integrity()
+        assert result["valid"] is False
+        assert result["broken_at_entry"] == 1
+
+    def test_legacy_lines_verify_with_new_entries(self, tmp_path):
+        log_file = AuditLogger(str(tmp_path)).current_log_file
+        previous_hash = None
+        lines = []
+        for i in range(4):
+            line, previous_hash = _legacy_line(_entry(i), previous_hash)
+            lines.append(line)
+        log_file.write_text("".join(lines), encoding="utf-8")
+
+        # A new logger continues the existing chain
+        audit_logger = AuditLogger(str(tmp_path))
+        _log(audit_logger, "CASE-NEW")
+        result = audit_logger.verify_chain_integrity()
+        audit_logger.close()
+
+        assert result["valid"] is True
+        assert result["entries"] == 5
+
+    def test_tampered_legacy_line_breaks_chain(self, tmp_path):
+        log_file = AuditLogger(str(tmp_path)).current_log_file
+        line, entry_hash = _legacy_line(_entry(0), None)
+        second, _ = _legacy_line(_entry(1), entry_hash)
+        log_file.write_text(line + second.replace("Pneumonia", "Influenza"), encoding="utf-8")
+
+        result = AuditLogger(str(tmp_path)).verify_chain_integrity()
+        assert result["valid"] is False
+        assert result["broken_at_entry"] == 1
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# CASE INDEX
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _audit_ids(entries):
+    return sorted(e["audit_id"] for e in entries)
+
+
+class TestCaseIndex:
+    """Case lookups through the .idx sidecar match a full scan of the logs."""
+
+    def test_lookup_returns_only_that_case(self, logger):
+        expected = [_log(logger, "CASE-A") for _ in range(3)]
+        _log(logger, "CASE-B")
+        logger.log_error("CASE-A", "Timeout", "GPT timed out")
+
+        entries = logger.get_entries_for_case("CASE-A")
+        assert len(entries) == 4
+        assert set(expected) <= {e["audit_id"] for e in entries}
+        assert logger.get_entries_for_case("CASE-C") == []
+
+    def test_index_file_written(self, logger):
+        _log(logger, "CASE-A")
+        logger.flush()
+        rows = logger.current_log_file.with_suffix(".idx").read_text().splitlines()
+
+        assert len(rows) == 1
+        assert rows[0].startswith('"CASE-A"\t0\t')
+
+    def test_log_without_index_is_scanned(self, tmp_path):
+        legacy = tmp_path / "audit_20240101.jsonl"
+        first, previous_hash = _legacy_line(_entry(0, "CASE-A"), None)
+        second, _ = _legacy_line(_entry(1, "CASE-B"), previous_hash)
+        legacy.write_text(first + second, encoding="utf-8")
+
+        audit_logger = AuditLogger(str(tmp_path))
+        new_id = _log(audit_logger, "CASE-A")
+        entries = audit_logger.get_entries_for_case("CASE-A")
+        audit_logger.close()
+
+        assert _audit_ids(entries) == sorted(["AUDIT-LEGACY0", new_id])
+
+    def test_lines_missing_from_index_are_found(self, logger):
+        first = _log(logger, "CASE-A")
+        logger.get_entries_for_case("CASE-A")  # Build the in-memory index
+        # A line appended without an index row, e.g. a crash between the writes
+        line, _ = _legacy_line(_entry(0, "CASE-A"), None)
+        with open(logger.current_log_file, "a", encoding="utf-8") as f:
+            f.write(line)
+        last = _log(logger, "CASE-A")
+
+        for reader in (logger, AuditLogger(str(logger.log_dir))):
+            assert _audit_ids(reader.get_entries_for_case("CASE-A")) == sorted([first, "AUDIT-LEGACY0", last])
+
+    def test_entries_from_another_writer_are_found(self, logger):
+        other = AuditLogger(str(logger.log_dir), flush_every=1)
+        ids = []
+        for i in range(6):
+            ids.append(_log(logger if i % 2 else other, "CASE-A"))
+            logger.flush()
+        other.close()
+
+        for reader in (logger, AuditLogger(str(logger.log_dir))):
+            assert _audit_ids(reader.get_entries_for_case("CASE-A")) == sorted(ids)
+
+    def test_deleted_index_is_rebuilt_from_log(self, logger):
+        ids = [_log(logger, "CASE-A") for _ in range(3)]
+        logger.close()
+        logger.current_log_file.with_suffix(".idx").unlink()
+
+        reader = AuditLogger(str(logger.log_dir))
+        assert _audit_ids(reader.get_entries_for_case("CASE-A")) == sorted(ids)
+
+    def test_rewritten_log_is_reindexed(self, logger):
+        _log(logger, "CASE-A")
+        _log(logger, "CASE-B")
+        assert len(logger.get_entries_for_case("CASE-A")) == 1
+        logger.close()
+        # Truncate to a shorter, different log
+        line, _ = _legacy_line(_entry(0, "CASE-B"), None)
+        logger.current_log_file.write_text(line, encoding="utf-8")
+        logger.current_log_file.with_suffix(".idx").unlink()
+
+        assert logger.get_entries_for_case("CASE-A") == []
+        assert _audit_ids(logger.get_entries_for_case("CASE-B")) == ["AUDIT-LEGACY0"]
+
+    def test_non_string_case_ids_do_not_collide(self, logger):
+        _log(logger, 5)
+        _log(logger, "5")
+
+        assert len(logger.get_entries_for_case(5)) == 1
+        assert len(logger.get_entries_for_case("5")) == 1
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GROUP COMMIT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class _ShortWrites:
+    """Log handle stand-in that writes at most `limit` bytes per call, then fails after `budget` bytes."""
+
+    def __init__(self, fh, limit, budget=None):
+        self._fh = fh
+        self.limit = limit
+        self.budget = budget
+
+    def write(self, data):
+        if self.budget is not None and self.budget <= 0:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        n = min(len(data), self.limit, self.budget if self.budget is not None else len(data))
+        if self.budget is not None:
+            self.budget -= n
+        return self._fh.write(data[:n])
+
+    def __getattr__(self, name):
+        return getattr(self._fh, name)
+
+
+class TestGroupCommit:
+    """Batches reach the log whole, even when the OS accepts only part of a write."""
+
+    def test_short_writes_are_retried(self, logger):
+        ids = [_log(logger, f"CASE-{i % 2}") for i in range(4)]
+        logger._fh = _ShortWrites(logger._fh, limit=100)
+        ids += [_log(logger, f"CASE-{i % 2}") for i in range(4)]
+        logger.flush()
+
+        result = logger.verify_chain_integrity()
+        assert result["valid"] is True
+        assert result["entries"] == 8
+        reader = AuditLogger(str(logger.log_dir))
+        assert _audit_ids(reader.get_entries_for_case("CASE-0")) == sorted(ids[0::2])
+        assert _audit_ids(reader.get_entries_for_case("CASE-1")) == sorted(ids[1::2])
+
+    def test_failed_write_keeps_the_rest_pending(self, logger):
+        logger.flush_every = 100
+        ids = [_log(logger, "CASE-A") for _ in range(3)]
+        real_fh = logger._fh
+        logger._fh = _ShortWrites(real_fh, limit=100, budget=150)
+
+        with pytest.raises(OSError):
+            logger.flush()
+        assert logger._pending_lines
+
+        # Space is back: the unwritten remainder follows what already landed
+        logger._fh = real_fh
+        ids.append(_log(logger, "CASE-A"))
+        logger.flush()
+
+        assert logger.verify_chain_integrity()["valid"] is True
+        reader = AuditLogger(str(logger.log_dir))
+        assert _audit_ids(reader.get_entries_for_case("CASE-A")) == sorted(ids)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# COMPLIANCE EXPORT
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestComplianceExport:
+    """Day files outside the requested range are skipped without losing entries."""
+
+    def _write_day(self, tmp_path, day, timestamps):
+        lines, previous_hash = [], None
+        for i, ts in enumerate(timestamps):
+            line, previous_hash = _legacy_line({**_entry(i, f"CASE-{day}"), "timestamp": ts}, previous_hash)
+            lines.append(line)
+        (tmp_path / f"audit_{day}.jsonl").write_text("".join(lines), encoding="utf-8")
+
+    def _export(self, logger, start, end):
+        with open(logger.export_for_compliance(start, end, output_file="export.json")) as f:
+            return sorted(e["timestamp"] for e in json.load(f)["entries"])
+
+    def test_date_range(self, tmp_path):
+        # Local-date file names can hold UTC timestamps from the neighbouring day
+        self._write_day(tmp_path, "20240101", ["2023-12-31T23:30:00+00:00", "2024-01-01T12:00:00+00:00"])
+        self._write_day(tmp_path, "20240105", ["2024-01-05T12:00:00+00:00", "2024-01-06T01:00:00+00:00"])
+        logger = AuditLogger(str(tmp_path))
+
+        assert self._export(logger, "2023-12-31", "2024-01-01T23") == [
+            "2023-12-31T23:30:00+00:00", "2024-01-01T12:00:00+00:00"
+        ]
+        assert self._export(logger, "2024-01-06", None) == ["2024-01-06T01:00:00+00:00"]
+        assert self._export(logger, None, "2023-12-31T23:59") == ["2023-12-31T23:30:00+00:00"]
+        assert len(self._export(logger, None, None)) == 4
+        logger.close()
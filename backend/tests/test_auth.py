@@ -0,0 +1,145 @@
+"""
+MADN-X Authentication Tests
+============================
+Password hashing (scrypt and legacy salted SHA-256) and the decoded JWT cache.
+
+Run with: pytest tests/test_auth.py -v
+"""
+
+import hashlib
+import time
+import jwt
+import pytest
+import sys
+import os
+from fastapi import HTTPException
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.core import auth
+from app.core.auth import User, create_access_token, decode_token, hash_password, verify_password
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# PASSWORD HASHING
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestPasswordHashing:
+    """scrypt hashes for new passwords; legacy hashes keep verifying."""
+
+    def test_hash_round_trip(self):
+        password_hash = hash_password("correct horse")
+
+        assert password_hash.startswith(f"scrypt${auth.SCRYPT_N}${auth.SCRYPT_R}${auth.SCRYPT_P}$")
+        assert verify_password("correct horse", password_hash) is True
+        assert verify_password("wrong horse", password_hash) is False
+
+    def test_hashes_are_salted(self):
+        assert hash_password("same password") != hash_password("same password")
+
+    def test_cost_parameters_are_read_from_the_hash(self):
+        salt = bytes(16)
+        derived = hashlib.scrypt(b"pw", salt=salt, n=2 ** 10, r=4, p=2, dklen=32)
+        password_hash = f"scrypt${2 ** 10}$4$2${salt.hex()}${derived.hex()}"
+
+        assert verify_password("pw", password_hash) is True
+        assert verify_password("pw2", password_hash) is False
+
+    def test_legacy_sha256_hash(self):
+        salt = "a1b2c3d4e5f60718"
+        password_hash = f"{salt}:{hashlib.sha256(f'{salt}hunter2'.encode()).hexdigest()}"
+
+        assert verify_password("hunter2", password_hash) is True
+        assert verify_password("hunter3", password_hash) is False
+
+    def test_non_ascii_password(self):
+        password_hash = hash_password("pässwörd")
+
+        assert verify_password("pässwörd", password_hash) is True
+        assert verify_password("passwort", password_hash) is False
+
+    @pytest.mark.parametrize("password_hash", [
+        "",
+        "no-separator",
+        "a:b:c",
+        "scrypt$16384$8$1$zz$00",
+        "scrypt$16384$8$1",
+        "scrypt$not$a$number$00$00",
+        "salt:hashé",
+    ])
+    def test_malformed_hash_is_rejected(self, password_hash):
+        assert verify_password("anything", password_hash) is False
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# JWT DECODE CACHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _token(exp, **claims):
+    return jwt.encode({"sub": "USER-1", "type": "access", "exp": exp, **claims}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+
+class TestTokenCache:
+    """Verified tokens are served from the cache until they expire."""
+
+    @pytest.fixture(autouse=True)
+    def empty_cache(self, monkeypatch):
+        monkeypatch.setattr(auth, "_jwt_cache", {})
+        self.decodes = []
+        real_decode = jwt.decode
+
+        def counting_decode(*args, **kwargs):
+            self.decodes.append(args[0])
+            return real_decode(*args, **kwargs)
+        monkeypatch.setattr(auth.jwt, "decode", counting_decode)
+
+    def test_repeat_decode_is_cached(self):
+        token = create_access_token(User(id="USER-1", email="a@example.com", password_hash="", name="A"))
+
+        assert decode_token(token)["sub"] == "USER-1"
+        assert decode_token(token)["sub"] == "USER-1"
+        assert len(self.decodes) == 1
+
+    def test_cached_payload_is_a_copy(self):
+        token = _token(int(time.time()) + 60)
+        decode_token(token)["sub"] = "USER-ADMIN"
+
+        assert decode_token(token)["sub"] == "USER-1"
+
+    def test_expired_cached_token_is_rejected(self):
+        exp = int(time.time()) + 1
+        token = _token(exp)
+        assert decode_token(token)["sub"] == "USER-1"
+
+        while time.time() <= exp:
+            time.sleep(0.05)
+        with pytest.raises(HTTPException) as excinfo:
+            decode_token(token)
+        assert excinfo.value.status_code == 401
+        assert excinfo.value.detail == "Token has expired"
+
+    def test_invalid_token_is_not_cached(self):
+        token = _token(int(time.time()) + 60)
+        forged = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                decode_token(forged)
+        assert forged not in auth._jwt_cache
+        assert len(self.decodes) == 2
+
+    def test_token_without_exp_is_not_cached(self):
+        token = jwt.encode({"sub": "USER-1", "type": "access"}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+        decode_token(token)
+        decode_token(token)
+
+        assert len(self.decodes) == 2
+
+    def test_oldest_token_is_evicted_at_capacity(self, monkeypatch):
+        monkeypatch.setattr(auth, "JWT_CACHE_SIZE", 2)
+        tokens = [_token(int(time.time()) + 60, n=i) for i in range(3)]
+        for token in tokens:
+            decode_token(token)
+
+        assert list(auth._jwt_cache) == tokens[1:]
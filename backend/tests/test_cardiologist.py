@@ -0,0 +1,140 @@
+"""
+MADN-X Cardiologist Tests
+==========================
+ECG pattern matching and GPT reply caching.
+
+Run with: pytest tests/test_cardiologist.py -v
+"""
+
+import asyncio
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from app.agents import cardiologist
+from app.agents.cardiologist import cardiologist_agent
+
+
+def _fake_client(replies):
+    """OpenAI client stand-in; each reply is a JSON string or an exception to raise."""
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        reply = replies[min(len(calls), len(replies)) - 1]
+        if isinstance(reply, Exception):
+            raise reply
+        message = SimpleNamespace(content=reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    return client, calls
+
+
+def _fake_async_client(replies):
+    """AsyncOpenAI stand-in built on _fake_client."""
+    client, calls = _fake_client(replies)
+
+    async def create(**kwargs):
+        return client.chat.completions.create(**kwargs)
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))), calls
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# NEGATION
+# ═══════════════════════════════════════════════════════════════════════════════
+
+# Every scan path: Hyperscan, Aho-Corasick anchors, Numba anchors, fused regex
+SCAN_PATHS = {
+    "hyperscan": {},
+    "automaton": {"_ECG_HS_DB": None},
+    "anchor_mask": {"_ECG_HS_DB": None, "_ECG_AUTOMATON": None},
+    "scanner": {"_ECG_HS_DB": None, "_ECG_AUTOMATON": None, "_scan_anchor_mask": None},
+}
+
+
+@pytest.fixture(params=list(SCAN_PATHS))
+def scan_path(request, monkeypatch):
+    for name, value in SCAN_PATHS[request.param].items():
+        monkeypatch.setattr(cardiologist, name, value)
+    cardiologist._match_ecg_keys.cache_clear()
+    yield request.param
+    cardiologist._match_ecg_keys.cache_clear()
+
+
+def _finding_names(ecg):
+    return [f.name for f in cardiologist.extract_ecg_findings(ecg)]
+
+
+class TestNegation:
+    """A pattern counts only if its first match is not negated."""
+
+    def test_negated_finding_is_dropped(self, scan_path):
+        assert "Atrial Fibrillation" not in _finding_names("No atrial fibrillation. Normal axis.")
+
+    def test_plain_finding_is_kept(self, scan_path):
+        assert "Atrial Fibrillation" in _finding_names("Atrial fibrillation with RVR")
+
+    def test_later_occurrence_does_not_override_negated_first(self, scan_path):
+        ecg = "no atrial fibrillation on prior; now atrial fibrillation with RVR"
+        assert "Atrial Fibrillation" not in _finding_names(ecg)
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# GPT REPLY CACHE
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestGPTCache:
+    """Only successful GPT replies are cached."""
+
+    ECG = "Sinus tachycardia at 118 bpm with T wave inversion in V1-V3"
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(cardiologist, "_gpt_cache", cardiologist.GPTResponseCache())
+
+    def test_failed_call_is_retried(self, monkeypatch):
+        """A GPT failure falls back once; the next call goes out again."""
+        client, calls = _fake_client([
+            RuntimeError("GPT unavailable"),
+            '{"interpretation": "Sinus tachycardia", "rhythm": "Sinus"}'
+        ])
+        monkeypatch.setattr(cardiologist, "client", client)
+
+        assert cardiologist_agent(self.ECG)["explanation"] == "Unable to generate interpretation"
+        assert cardiologist_agent(self.ECG)["explanation"] == "Sinus tachycardia"
+        assert len(calls) == 2
+
+    def test_successful_reply_is_reused(self, monkeypatch):
+        """A parsed reply is served from the cache for the same ECG."""
+        client, calls = _fake_client(['{"interpretation": "Sinus tachycardia", "rhythm": "Sinus"}'])
+        monkeypatch.setattr(cardiologist, "client", client)
+
+        first = cardiologist_agent(self.ECG)
+        first["flags"].append("mutated by caller")
+        second = cardiologist_agent(self.ECG)
+
+        assert second["explanation"] == "Sinus tachycardia"
+        assert "mutated by caller" not in second["flags"]
+        assert len(calls) == 1
+
+    def test_async_agent_shares_the_cache(self, monkeypatch):
+        """The async agent matches the sync one and reuses its cached reply."""
+        client, calls = _fake_client(['{"interpretation": "Sinus tachycardia", "rhythm": "Sinus"}'])
+        aclient, async_calls = _fake_async_client([RuntimeError("not called")])
+        monkeypatch.setattr(cardiologist, "client", client)
+        monkeypatch.setattr(cardiologist, "aclient", aclient)
+
+        sync_report = cardiologist_agent(self.ECG)
+        async_report = asyncio.run(cardiologist.cardiologist_agent_async(self.ECG))
+
+        assert async_report == sync_report
+        assert len(calls) == 1
+        assert async_calls == []
@@ -0,0 +1,57 @@
+"""
+MADN-X Empty Input Report Tests
+================================
+Reports for empty lab and symptom input are independent copies.
+
+Run with: pytest tests/test_empty_reports.py -v
+"""
+
+import pytest
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from app.agents.pathologist import pathologist_agent, pathologist_agent_batch
+from app.agents.pulmonologist import pulmonologist_agent, pulmonologist_agent_batch
+
+
+AGENTS = {
+    "pathologist": (pathologist_agent, pathologist_agent_batch),
+    "pulmonologist": (pulmonologist_agent, pulmonologist_agent_batch),
+}
+
+
+@pytest.fixture(params=list(AGENTS))
+def agent(request):
+    return AGENTS[request.param]
+
+
+class TestEmptyInputReport:
+    """Mutating one empty-input report does not leak into later ones."""
+
+    def _mutate(self, report):
+        report["flags"].append("mutated by caller")
+        report["findings"].append("finding")
+        report["hypotheses"].append("hypothesis")
+        report["diagnoses"]["Pneumonia"] = 1.0
+
+    def test_report_shape(self, agent):
+        single, _ = agent
+        report = single("   ")
+
+        assert report["flags"] == ["INCOMPLETE_DATA"]
+        assert report["findings"] == [] and report["hypotheses"] == [] and report["diagnoses"] == {}
+
+    def test_mutation_does_not_leak(self, agent):
+        single, batch = agent
+        self._mutate(single(""))
+        for report in batch(["", None]):
+            self._mutate(report)
+
+        for report in [single(""), *batch([""])]:
+            assert report["flags"] == ["INCOMPLETE_DATA"]
+            assert report["findings"] == [] and report["hypotheses"] == [] and report["diagnoses"] == {}
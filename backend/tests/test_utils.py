@@ -0,0 +1,174 @@
+"""
+MADN-X Utility Tests
+=====================
+Literal prefilters derived from the agents' regexes and batched Hyperscan
+scans bucketed back into their records.
+
+Run with: pytest tests/test_utils.py -v
+"""
+
+import json
+import random
+import re
+import pytest
+import sys
+import os
+
+# Add the app directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from app.agents import pathologist, pulmonologist
+from app.agents.pathologist import LAB_PATTERNS
+from app.agents.pulmonologist import SYMPTOM_PATTERNS
+from app.core.utils import hyperscan_scan_records, required_literals, sre_constants, sre_parse
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# REQUIRED LITERALS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_CATEGORY_CHARS = {
+    sre_constants.CATEGORY_DIGIT: "07",
+    sre_constants.CATEGORY_NOT_DIGIT: "a ",
+    sre_constants.CATEGORY_SPACE: " \t",
+    sre_constants.CATEGORY_NOT_SPACE: "a1",
+    sre_constants.CATEGORY_WORD: "a_1",
+    sre_constants.CATEGORY_NOT_WORD: " -",
+}
+
+
+def _sample(items, rng):
+    """A random string the parsed pattern is likely (not guaranteed) to match."""
+    out = []
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            out.append(chr(av))
+        elif op is sre_constants.ANY:
+            out.append(rng.choice("a .-"))
+        elif op is sre_constants.IN:
+            choices = []
+            for member_op, member_av in av:
+                if member_op is sre_constants.LITERAL:
+                    choices.append(chr(member_av))
+                elif member_op is sre_constants.RANGE:
+                    choices.append(chr(rng.randint(*member_av)))
+                elif member_op is sre_constants.CATEGORY:
+                    choices.append(rng.choice(_CATEGORY_CHARS[member_av]))
+            out.append(rng.choice(choices or ["a"]))
+        elif op is sre_constants.SUBPATTERN:
+            out.append(_sample(av[-1], rng))
+        elif op is sre_constants.BRANCH:
+            out.append(_sample(rng.choice(av[1]), rng))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT):
+            low, high = av[0], min(av[1], av[0] + 2)
+            out.append("".join(_sample(av[2], rng) for _ in range(rng.randint(low, high))))
+    return "".join(out)
+
+
+_AGENT_REGEXES = sorted({
+    pattern
+    for table in (SYMPTOM_PATTERNS, LAB_PATTERNS)
+    for config in table.values()
+    for pattern in config["patterns"]
+    if re.escape(pattern) != pattern
+})
+
+
+class TestRequiredLiterals:
+    """Every match of a regex contains one of its derived literals."""
+
+    @pytest.mark.parametrize("pattern, literals", [
+        (r"hemoptysis", {"hemoptysis"}),
+        (r"(foo)?bar", {"bar"}),
+        (r"(abc|d)", {"abc", "d"}),
+        (r"(ab)+", {"ab"}),
+        (r"[ab]c", {"c"}),
+        (r"d.?dimer", {"dimer"}),
+        (r"sputum\s*production", {"production"}),
+        (r"(yellow|green|purulent)\s*sputum", {"sputum"}),
+    ])
+    def test_derived_literals(self, pattern, literals):
+        assert required_literals(pattern) == literals
+
+    @pytest.mark.parametrize("pattern", [r"a*", r"x?", r"(ab|\d)", r"[ab]+", r"\bfev\d?|"])
+    def test_no_literal_when_one_is_not_required(self, pattern):
+        assert required_literals(pattern) is None
+
+    @pytest.mark.parametrize("pattern", _AGENT_REGEXES)
+    def test_agent_patterns_are_gated_soundly(self, pattern):
+        literals = required_literals(pattern)
+        if literals is None:
+            return
+        compiled = re.compile(pattern)
+        rng = random.Random(pattern)
+        parsed = sre_parse.parse(pattern)
+        for _ in range(50):
+            text = f"pt {_sample(parsed, rng)} noted"
+            if compiled.search(text):
+                assert any(literal in text for literal in literals), text
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# BATCHED HYPERSCAN SCANS
+# ═══════════════════════════════════════════════════════════════════════════════
+
+def _scan_records(expressions, texts):
+    hyperscan = pytest.importorskip("hyperscan")
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[e.encode() for e in expressions],
+        ids=list(range(len(expressions))),
+        elements=len(expressions),
+        flags=hyperscan.HS_FLAG_SOM_LEFTMOST
+    )
+    return hyperscan_scan_records(db, hyperscan.Scratch(db), texts)
+
+
+class TestScanRecords:
+    """Hits land in the record they occur in; straddled records are flagged."""
+
+    def test_hits_are_bucketed_per_record(self):
+        texts = ["fever and cough", "", "no findings", "cough", "wheeze"]
+        results = _scan_records([r"cough", r"fever", r"whee?ze"], texts)
+
+        assert results == [{0, 1}, set(), set(), {0}, {2}]
+
+    def test_match_across_separator_is_not_reported(self):
+        assert _scan_records([r"a\s*b"], ["a", "b"]) == [set(), set()]
+
+    def test_straddled_record_must_be_rescanned(self):
+        # "x" + separator + "xz" matches from the first x, hiding the second
+        # record's own "xz" (only the leftmost start per end is reported)
+        results = _scan_records([r"x[^y]*z"], ["x", "xz", "yxz"])
+
+        assert results[0] == set()
+        assert results[1] is None
+        assert results[2] == {0}
+
+
+# Every sample history and lab panel, plus texts the batch DB cannot take
+_SAMPLE_CASES = json.load(open(os.path.join(os.path.dirname(__file__), "sample_cases.json")))
+_BATCH_TEXTS = [case[field].lower() for case in _SAMPLE_CASES for field in ("symptoms_text", "lab_text")] + [
+    "",
+    "cough é fever",
+    "sputum\x1cproduction",
+    "wbc > 12 crp > 10 d-dimer elevated troponin i 0.4",
+]
+
+
+class TestBatchMatching:
+    """Batched keyword matching agrees with matching each text alone."""
+
+    @pytest.mark.parametrize("match_one, match_batch, db", [
+        ("_match_symptom_keys", "_match_symptom_keys_batch", (pulmonologist, "_SYMPTOM_HS_DB")),
+        ("_match_lab_keys", "_match_lab_keys_batch", (pathologist, "_LAB_HS_DB")),
+    ])
+    def test_batch_matches_single_scans(self, match_one, match_batch, db, monkeypatch):
+        module, db_name = db
+        batched = getattr(module, match_batch)(_BATCH_TEXTS)
+
+        # Compare against the re-module path rather than Hyperscan itself
+        monkeypatch.setattr(module, db_name, None)
+        assert batched == [getattr(module, match_one)(text) for text in _BATCH_TEXTS]